@@ -1,15 +1,59 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
+from app.sharding import ShardedSession
 
-# Initialisation des extensions
-app = Flask(__name__)
-app.config.from_object(Config)
+# Extensions non liées : elles sont attachées à chaque application par create_app
+db = SQLAlchemy(session_options={'class_': ShardedSession})
+jwt = JWTManager()
 
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
-
-# Importation des routes après l'initialisation des extensions
-# pour éviter les importations circulaires
-from app import routes, models
\ No newline at end of file
+def create_app(config=None):
+    """
+    Fabrique de l'application
+    `config` peut être une classe de configuration ou un dictionnaire de surcharges.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    
+    # La base d'archive suit la base principale sauf configuration explicite
+    app.config.setdefault('SQLALCHEMY_BINDS', {
+        'archive': app.config['ARCHIVE_DATABASE_URL'] or app.config['SQLALCHEMY_DATABASE_URI']
+    })
+    # Un bind par shard de commandes
+    app.config['ORDER_SHARDS'] = [f'shard{i}' for i in range(len(app.config['ORDER_SHARD_URLS']))]
+    app.config['SQLALCHEMY_BINDS'] = dict(
+        app.config['SQLALCHEMY_BINDS'],
+        **dict(zip(app.config['ORDER_SHARDS'], app.config['ORDER_SHARD_URLS']))
+    )
+    
+    # Derrière un proxy, l'adresse du client (clé des seaux de limitation anonymes)
+    # est lue dans X-Forwarded-For, posé par les proxies de confiance uniquement
+    if app.config['PROXY_FIX_HOPS']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_HOPS'])
+    
+    db.init_app(app)
+    jwt.init_app(app)
+    
+    # Importation des routes à la création de l'application
+    # pour éviter les importations circulaires
+    from app.routes import auth_bp, products_bp, orders_bp, cart_bp, admin_bp
+    from app.archive import archive_orders_command
+    from app.compression import compress_response
+    from app.profiler import init_profiler
+    
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(products_bp)
+    app.register_blueprint(orders_bp)
+    app.register_blueprint(cart_bp)
+    app.register_blueprint(admin_bp)
+    app.cli.add_command(archive_orders_command)
+    app.after_request(compress_response)
+    init_profiler(app)
+    
+    return app
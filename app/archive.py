@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import Order, OrderItem, OrderEvent, ArchivedOrder, ArchivedOrderItem
+from app.sharding import shard_keys, use_shard
+
+# Seules les commandes dans un état final sont archivées
+ARCHIVABLE_STATUSES = ('expédiée', 'annulée')
+
+def archive_orders(before, batch_size=None):
+    """
+    Déplace les commandes terminées antérieures à `before` vers la base d'archive.
+    Chaque lot est d'abord écrit dans l'archive puis supprimé des tables actives :
+    une interruption entre les deux étapes laisse un doublon, résorbé au lancement suivant.
+    Les événements des commandes archivées sont supprimés du journal avec elles : leurs ids ne
+    sont jamais réutilisés (AUTOINCREMENT), les curseurs des clients restent valides.
+    Retourne le nombre de commandes archivées.
+    """
+    batch_size = batch_size or current_app.config['ORDER_ARCHIVE_BATCH_SIZE']
+    archived = 0
+
+    for shard in shard_keys() or [None]:
+        with use_shard(shard):
+            archived += archive_shard_orders(before, batch_size)
+
+    return archived
+
+def archive_shard_orders(before, batch_size):
+    """
+    Archive les commandes d'un shard (ou de la base principale sans sharding)
+    """
+    archived = 0
+
+    while True:
+        orders = (Order.query
+                  .options(selectinload(Order.user), selectinload(Order.items).selectinload(OrderItem.product))
+                  .filter(Order.statut.in_(ARCHIVABLE_STATUSES), Order.date_commande < before)
+                  .order_by(Order.id)
+                  .limit(batch_size)
+                  .all())
+        if not orders:
+            break
+
+        # Étape 1 : copie idempotente dans l'archive
+        for order in orders:
+            archived_order = ArchivedOrder(
+                id=order.id,
+                utilisateur_id=order.utilisateur_id,
+                utilisateur_nom=order.user.nom if order.user else None,
+                date_commande=order.date_commande,
+                adresse_livraison=order.adresse_livraison,
+                statut=order.statut,
+                date_archivage=datetime.utcnow(),
+                items=[
+                    ArchivedOrderItem(
+                        id=item.id,
+                        produit_id=item.produit_id,
+                        produit_nom=item.product.nom if item.product else None,
+                        quantite=item.quantite,
+                        prix_unitaire=item.prix_unitaire
+                    )
+                    for item in order.items
+                ]
+            )
+            db.session.merge(archived_order)
+        db.session.commit()
+
+        # Étape 2 : suppression des tables actives et du journal
+        order_ids = [order.id for order in orders]
+        OrderEvent.query.filter(OrderEvent.commande_id.in_(order_ids)).delete(synchronize_session=False)
+        OrderItem.query.filter(OrderItem.commande_id.in_(order_ids)).delete(synchronize_session=False)
+        Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expunge_all()
+
+        archived += len(order_ids)
+
+    return archived
+
+def find_order(order_id):
+    """
+    Recherche une commande dans les tables actives puis dans l'archive
+    """
+    return db.session.get(Order, order_id) or db.session.get(ArchivedOrder, order_id)
+
+@click.command('archive-orders')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help="Date limite (AAAA-MM-JJ), par défaut la fenêtre de rétention")
+@click.option('--batch-size', type=int, default=None, help="Nombre de commandes par transaction")
+@with_appcontext
+def archive_orders_command(before, batch_size):
+    """
+    Archive les commandes expédiées ou annulées antérieures à une date
+    """
+    if before is None:
+        before = datetime.utcnow() - timedelta(days=current_app.config['ORDER_RETENTION_DAYS'])
+
+    count = archive_orders(before, batch_size)
+    click.echo(f"{count} commande(s) archivée(s) avant le {before.date().isoformat()}")
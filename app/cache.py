@@ -0,0 +1,107 @@
+import threading
+import time
+from flask import current_app
+
+class StockCache:
+    """
+    Cache en mémoire des quantités en stock, par worker.
+    Les écritures du worker invalident leurs produits ; celles des autres workers
+    deviennent visibles au plus tard après STOCK_CACHE_TTL secondes.
+    """
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get_many(self, product_ids):
+        """
+        Retourne les quantités connues et la liste des identifiants à charger
+        """
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for product_id in product_ids:
+                entry = self._entries.get(product_id)
+                if entry and entry[1] > now:
+                    found[product_id] = entry[0]
+                else:
+                    missing.append(product_id)
+        return found, missing
+
+    def set_many(self, quantities):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if len(self._entries) + len(quantities) > self.max_size:
+                self._entries.clear()
+            for product_id, quantite in quantities.items():
+                self._entries[product_id] = (quantite, expires)
+
+    def invalidate(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+
+def get_stock_cache():
+    """
+    Cache de stock propre à l'instance de l'application
+    """
+    cache = current_app.extensions.get('stock_cache')
+    if cache is None:
+        cache = StockCache(current_app.config['STOCK_CACHE_TTL'], current_app.config['STOCK_CACHE_MAX_SIZE'])
+        current_app.extensions['stock_cache'] = cache
+    return cache
+
+def invalidate_stock(product_ids):
+    """
+    Invalide le stock en cache des produits modifiés (à appeler après le commit)
+    Le catalogue contenant les quantités, il est invalidé lui aussi.
+    """
+    get_stock_cache().invalidate(product_ids)
+    get_catalogue_cache().clear()
+
+
+class CatalogueCache:
+    """
+    Corps JSON du catalogue par catégorie, avec leurs versions compressées.
+    Invalidé par les écritures du worker, borné par CATALOGUE_CACHE_TTL et par
+    CATALOGUE_CACHE_MAX_SIZE entrées (les expirées puis les plus anciennes sont évincées).
+    """
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def set(self, key, body):
+        variants = {'identity': body}
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_size:
+                self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+                while len(self._entries) >= self.max_size:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (variants, now + self.ttl)
+        return variants
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def get_catalogue_cache():
+    """
+    Cache du catalogue propre à l'instance de l'application
+    """
+    cache = current_app.extensions.get('catalogue_cache')
+    if cache is None:
+        cache = CatalogueCache(current_app.config['CATALOGUE_CACHE_TTL'], current_app.config['CATALOGUE_CACHE_MAX_SIZE'])
+        current_app.extensions['catalogue_cache'] = cache
+    return cache
@@ -0,0 +1,62 @@
+from app.models import Product
+from app.schemas import ORDER_SCHEMA, CART_SCHEMA
+from app.stock import available_stock
+
+def price_orders(orders_data, require_address=True, shard=None):
+    """
+    Valide et chiffre plusieurs commandes en chargeant tous les produits en une requête.
+    Le stock est décompté d'une commande à l'autre, comme si elles étaient passées dans l'ordre.
+    `shard` : shard où les commandes seront créées (stock total si None).
+    Retourne une liste de résultats {index, total, lignes, errors}.
+    """
+    # Validation de toutes les commandes par le même schéma compilé, avant toute requête :
+    # seules les commandes valides (au plus ORDER_MAX_ITEMS articles) chargent leurs produits
+    schema = ORDER_SCHEMA if require_address else CART_SCHEMA
+    invalid = schema.validate_many(orders_data)
+    wanted = {}
+    for index, order_data in enumerate(orders_data):
+        if index not in invalid:
+            for item in order_data['items']:
+                wanted[item['produit_id']] = wanted.get(item['produit_id'], 0) + item['quantite']
+    products = {}
+    if wanted:
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(wanted))}
+    remaining = available_stock({product_id: wanted[product_id] for product_id in products}, shard) if products else {}
+
+    results = []
+    for index, order_data in enumerate(orders_data):
+        result = {'index': index, 'total': 0, 'lignes': [], 'errors': invalid.get(index, {})}
+        results.append(result)
+        if result['errors']:
+            continue
+
+        reserved = {}
+        for i, item in enumerate(order_data['items']):
+            product = products.get(item['produit_id'])
+            if not product:
+                result['errors'][f'items[{i}].produit_id'] = f"Produit {item['produit_id']} non trouvé"
+                continue
+
+            reserved[product.id] = reserved.get(product.id, 0) + item['quantite']
+            if remaining[product.id] < reserved[product.id]:
+                result['errors'][f'items[{i}].quantite'] = f"Stock insuffisant pour {product.nom}"
+                continue
+
+            result['lignes'].append({
+                'produit_id': product.id,
+                'produit': product.nom,
+                'quantite': item['quantite'],
+                'prix_unitaire': product.prix,
+                'prix_total': product.prix * item['quantite']
+            })
+
+        if result['errors']:
+            result['lignes'] = []
+            continue
+
+        # Commande valide : son stock n'est plus disponible pour les suivantes
+        for product_id, quantite in reserved.items():
+            remaining[product_id] -= quantite
+        result['total'] = sum(line['prix_total'] for line in result['lignes'])
+
+    return results
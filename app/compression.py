@@ -0,0 +1,88 @@
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seul si absente
+    brotli = None
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_encoding(accept_encoding):
+    """
+    Choisit l'encodage à appliquer selon l'en-tête Accept-Encoding (None si aucun)
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def compress(body, encoding):
+    level = current_app.config['COMPRESSION_LEVEL']
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def is_compressible(response):
+    return (response.mimetype in current_app.config['COMPRESSION_MIMETYPES']
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 200 <= response.status_code < 300
+            and 'Content-Encoding' not in response.headers)
+
+def compress_response(response):
+    """
+    Compresse les réponses JSON au-delà de COMPRESSION_MIN_SIZE (hook after_request)
+    """
+    if not current_app.config['COMPRESSION_ENABLED'] or not is_compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < current_app.config['COMPRESSION_MIN_SIZE']:
+        return response
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def cached_json_response(variants):
+    """
+    Réponse JSON servie depuis le cache du catalogue.
+    `variants` associe un encodage à son corps : la version compressée est calculée
+    une seule fois par version du catalogue puis conservée dans l'entrée du cache.
+    """
+    body = variants['identity']
+    response = current_app.response_class(body, mimetype='application/json')
+    if not current_app.config['COMPRESSION_ENABLED']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if len(body) < current_app.config['COMPRESSION_MIN_SIZE']:
+        return response
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if encoding not in variants:
+        variants[encoding] = compress(body, encoding)
+    response.set_data(variants[encoding])
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -67,7 +67,20 @@ class Product(db.Model):
         }
 
 
+# Statuts de commande et transitions autorisées
+ORDER_STATUSES = ('en_attente', 'validée', 'expédiée', 'annulée')
+ORDER_TRANSITIONS = {
+    'en_attente': ('validée', 'annulée'),
+    'validée': ('expédiée', 'annulée'),
+    'expédiée': (),
+    'annulée': (),
+}
+
+
 class Order(db.Model):
+    # Table répartie par utilisateur lorsque ORDER_SHARDS est configuré
+    __table_args__ = {'info': {'sharded': True}}
+    
     id = db.Column(db.Integer, primary_key=True)
     utilisateur_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date_commande = db.Column(db.DateTime, default=datetime.utcnow)
@@ -90,6 +103,8 @@ class Order(db.Model):
 
 
 class OrderItem(db.Model):
+    __table_args__ = {'info': {'sharded': True}}
+    
     id = db.Column(db.Integer, primary_key=True)
     commande_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     produit_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
@@ -105,4 +120,91 @@ class OrderItem(db.Model):
             'quantite': self.quantite,
             'prix_unitaire': self.prix_unitaire,
             'prix_total': self.prix_unitaire * self.quantite
-        }
\ No newline at end of file
+        }
+
+class OrderEvent(db.Model):
+    """
+    Journal append-only des changements de commandes.
+    L'id sert de curseur pour la synchronisation incrémentale des clients :
+    AUTOINCREMENT garantit qu'un id n'est jamais réutilisé, même après suppression.
+    Avec le sharding, chaque shard tient le journal de ses commandes (un curseur par shard).
+    """
+    __table_args__ = {'sqlite_autoincrement': True, 'info': {'sharded': True}}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    commande_id = db.Column(db.Integer, nullable=False, index=True)
+    utilisateur_id = db.Column(db.Integer, nullable=False, index=True)
+    statut = db.Column(db.String(20), nullable=False)
+    date_evenement = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'commande_id': self.commande_id,
+            'utilisateur_id': self.utilisateur_id,
+            'statut': self.statut,
+            'date_evenement': self.date_evenement.isoformat() if self.date_evenement else None
+        }
+
+
+class StockReservation(db.Model):
+    """
+    Stock réservé aux commandes d'un shard, prélevé par blocs sur Product.quantite_stock
+    (voir app/stock.py). Inutilisé sans sharding.
+    """
+    __table_args__ = {'info': {'sharded': True}}
+    
+    produit_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    quantite = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ArchivedOrder(db.Model):
+    """
+    Commande terminée déplacée hors des tables actives par `flask archive-orders`.
+    Stockée dans la base d'archive (bind 'archive').
+    """
+    __bind_key__ = 'archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    utilisateur_id = db.Column(db.Integer, nullable=False, index=True)
+    utilisateur_nom = db.Column(db.String(100))
+    date_commande = db.Column(db.DateTime)
+    adresse_livraison = db.Column(db.String(200), nullable=False)
+    statut = db.Column(db.String(20), nullable=False)
+    date_archivage = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    items = db.relationship('ArchivedOrderItem', backref='order', lazy=True, cascade="all, delete-orphan")
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'utilisateur_id': self.utilisateur_id,
+            'utilisateur': self.utilisateur_nom,
+            'date_commande': self.date_commande.isoformat() if self.date_commande else None,
+            'adresse_livraison': self.adresse_livraison,
+            'statut': self.statut,
+            'total': sum(item.prix_unitaire * item.quantite for item in self.items),
+            'archivee': True
+        }
+
+
+class ArchivedOrderItem(db.Model):
+    __bind_key__ = 'archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    commande_id = db.Column(db.Integer, db.ForeignKey('archived_order.id'), nullable=False, index=True)
+    produit_id = db.Column(db.Integer, nullable=False)
+    produit_nom = db.Column(db.String(100))
+    quantite = db.Column(db.Integer, nullable=False)
+    prix_unitaire = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'commande_id': self.commande_id,
+            'produit_id': self.produit_id,
+            'produit': self.produit_nom,
+            'quantite': self.quantite,
+            'prix_unitaire': self.prix_unitaire,
+            'prix_total': self.prix_unitaire * self.quantite
+        }
@@ -0,0 +1,313 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from flask import current_app, g, request
+from sqlalchemy import event
+from app import db
+
+def collapse_stack(frame):
+    """
+    Convertit une pile d'appels au format "collapsed" des flamegraphs (racine;...;feuille)
+    """
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+def write_json(path, data):
+    # Écriture atomique : les autres workers ne lisent jamais un fichier partiel.
+    # Fichier temporaire unique : plusieurs threads d'un worker peuvent écrire en même temps.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Profiler:
+    """
+    Profileur par échantillonnage d'un worker.
+    L'état (actif, taux, version) est partagé entre les workers via un fichier de contrôle ;
+    chaque worker y dépose ses agrégats dans un fichier <pid>-<jeton>.json, rafraîchi
+    périodiquement (heartbeat) pendant le profilage pour que les fichiers des workers arrêtés
+    soient ignorés. Désactivé, le worker n'écrit plus rien après un dernier dépôt.
+    """
+    def __init__(self, directory, sample_interval, check_interval, flush_interval, worker_timeout):
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.check_interval = check_interval
+        self.flush_interval = flush_interval
+        self.worker_timeout = worker_timeout
+        self.enabled = False
+        self.rate = 0.0
+        self.version = 0
+        self._next_check = 0
+        self._last_flush = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # une seule écriture du fichier du worker à la fois
+        self._active = {}  # identifiant de thread -> endpoint échantillonné
+        self._wakeup = threading.Event()
+        self._sampler = None
+        self._engines = []
+        self._worker = None
+        self._reset_data()
+
+    def _reset_data(self):
+        self.endpoints = {}
+        self.stacks = {}
+        self.sql = {}
+
+    @property
+    def control_path(self):
+        return os.path.join(self.directory, 'control.json')
+
+    @property
+    def worker_path(self):
+        # Jeton aléatoire : un pid réutilisé n'écrase pas le fichier d'un autre worker
+        pid = os.getpid()
+        if self._worker is None or self._worker[0] != pid:
+            self._worker = (pid, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+        return os.path.join(self.directory, self._worker[1])
+
+    def read_control(self):
+        try:
+            with open(self.control_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'actif': False, 'taux': 0, 'version': 0}
+
+    def write_control(self, **changes):
+        control = self.read_control()
+        control.update(changes)
+        os.makedirs(self.directory, exist_ok=True)
+        write_json(self.control_path, control)
+        # Appliquer immédiatement dans ce worker
+        self._next_check = 0
+        self.refresh()
+        return control
+
+    def reset(self):
+        """
+        Efface les agrégats de tous les workers
+        """
+        control = self.write_control(version=self.read_control()['version'] + 1)
+        for name in os.listdir(self.directory):
+            if name != 'control.json' and name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return control
+
+    def refresh(self):
+        """
+        Relit le fichier de contrôle au plus une fois par check_interval
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+
+        control = self.read_control()
+        if control['version'] != self.version:
+            with self._lock:
+                self._reset_data()
+            self.version = control['version']
+        self.rate = control['taux'] / 100
+
+        if control['actif'] and not self.enabled:
+            self._enable()
+        elif not control['actif'] and self.enabled:
+            self._disable()
+
+    def _enable(self):
+        self.enabled = True
+        self._wakeup.set()
+        self._engines = list(db.engines.values())
+        for engine in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._sampler.start()
+
+    def _disable(self):
+        self.enabled = False
+        self._wakeup.set()
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines = []
+        self.flush(force=True)
+
+    def _run(self):
+        """
+        Thread du worker : pendant le profilage, échantillonne les piles et rafraîchit le
+        heartbeat du fichier du worker ; désactivé, il attend sans rien faire.
+        """
+        while True:
+            if not self.enabled:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            self.flush()
+            if not self._active:
+                self._wakeup.wait(min(0.5, self.flush_interval))
+                self._wakeup.clear()
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, endpoint in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = f"{endpoint};{collapse_stack(frame)}"
+                        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            del frames
+            time.sleep(self.sample_interval)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() in self._active:
+            conn.info.setdefault('profile_starts', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profile_starts')
+        if not starts:
+            return
+        duration = (time.perf_counter() - starts.pop()) * 1000
+        with self._lock:
+            stats = self.sql.setdefault(statement, [0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+
+    def start_request(self):
+        """
+        Hook before_request : décide si la requête est échantillonnée
+        """
+        self.refresh()
+        if not self.enabled or random.random() >= self.rate:
+            return
+        g.profile_start = time.perf_counter()
+        with self._lock:
+            self._active[threading.get_ident()] = request.endpoint or request.path
+        self._wakeup.set()
+
+    def end_request(self, exc=None):
+        """
+        Hook teardown_request : enregistre la durée de la requête échantillonnée
+        """
+        start = g.pop('profile_start', None)
+        if start is None:
+            return
+        duration = (time.perf_counter() - start) * 1000
+        with self._lock:
+            endpoint = self._active.pop(threading.get_ident(), None)
+            stats = self.endpoints.setdefault(endpoint, {'requetes': 0, 'temps_total_ms': 0.0, 'temps_max_ms': 0.0})
+            stats['requetes'] += 1
+            stats['temps_total_ms'] += duration
+            stats['temps_max_ms'] = max(stats['temps_max_ms'], duration)
+        self.flush()
+
+    def flush(self, force=False):
+        """
+        Dépose les agrégats du worker dans le répertoire partagé.
+        Une écriture impossible est ignorée : elle ne doit jamais faire échouer une requête.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        # Sans `force`, un dépôt déjà en cours dans un autre thread suffit
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            with self._lock:
+                data = {
+                    'version': self.version,
+                    'actif': self.enabled,
+                    'heartbeat': time.time(),
+                    'endpoints': dict(self.endpoints),
+                    'stacks': dict(self.stacks),
+                    'sql': dict(self.sql)
+                }
+            os.makedirs(self.directory, exist_ok=True)
+            write_json(self.worker_path, data)
+        except OSError:
+            pass
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """
+        Fusionne les agrégats des workers pour la version courante.
+        Le dernier dépôt d'un worker désactivé reste valable ; un fichier encore actif sans
+        heartbeat depuis worker_timeout (worker arrêté pendant le profilage) est supprimé.
+        """
+        self.flush(force=True)
+        version = self.read_control()['version']
+        stale_before = time.time() - self.worker_timeout
+        endpoints, stacks, sql = {}, {}, {}
+
+        for name in os.listdir(self.directory):
+            if name == 'control.json' or not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('actif', True) and data.get('heartbeat', 0) < stale_before:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if data.get('version') != version:
+                continue
+
+            for endpoint, stats in data['endpoints'].items():
+                merged = endpoints.setdefault(endpoint, {'requetes': 0, 'temps_total_ms': 0.0, 'temps_max_ms': 0.0})
+                merged['requetes'] += stats['requetes']
+                merged['temps_total_ms'] += stats['temps_total_ms']
+                merged['temps_max_ms'] = max(merged['temps_max_ms'], stats['temps_max_ms'])
+            for stack, count in data['stacks'].items():
+                stacks[stack] = stacks.get(stack, 0) + count
+            for statement, (count, total) in data['sql'].items():
+                merged = sql.setdefault(statement, [0, 0.0])
+                merged[0] += count
+                merged[1] += total
+
+        return endpoints, stacks, sql
+
+def get_profiler():
+    return current_app.extensions['profiler']
+
+def init_profiler(app):
+    """
+    Attache le profileur à l'application ; inactif tant qu'un admin ne l'active pas
+    """
+    directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+    profiler = Profiler(
+        directory,
+        app.config['PROFILE_SAMPLE_INTERVAL'],
+        app.config['PROFILE_CONTROL_CHECK_INTERVAL'],
+        app.config['PROFILE_FLUSH_INTERVAL'],
+        app.config['PROFILE_WORKER_TIMEOUT']
+    )
+    app.extensions['profiler'] = profiler
+    app.before_request(profiler.start_request)
+    app.teardown_request(profiler.end_request)
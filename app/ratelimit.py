@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+def consume_token(tokens, updated, now, capacity, refill_rate, cost=1):
+    """
+    Applique l'algorithme du seau à jetons (`cost` jetons par requête, au plus `capacity`).
+    Retourne (autorisé, jetons restants, secondes avant que la requête puisse passer).
+    """
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+    if tokens >= cost:
+        return True, tokens - cost, 0
+
+    return False, tokens, (cost - tokens) / refill_rate
+
+
+class MemoryBackend:
+    """
+    Seaux stockés dans le processus (un compteur par worker gunicorn)
+    """
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            allowed, tokens, retry_after = consume_token(tokens, updated, now, capacity, refill_rate, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        # Un seau inactif depuis une heure est de toute façon plein
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < 3600}
+
+
+class SQLiteBackend:
+    """
+    Seaux partagés entre les workers via un fichier SQLite local
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, timeout=1):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._calls = 0
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        # Horloge murale : elle doit être comparable d'un processus à l'autre
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            # Base verrouillée au-delà du timeout : laisser passer plutôt que répondre 500
+            return True, 0
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (None, now)
+            allowed, tokens, retry_after = consume_token(tokens, updated, now, capacity, refill_rate, cost)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError:
+            conn.execute('ROLLBACK')
+            return True, 0
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Compte les requêtes en cours par route dans le worker
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+
+    def acquire(self, name, limit):
+        with self._lock:
+            if self._active.get(name, 0) >= limit:
+                return False
+            self._active[name] = self._active.get(name, 0) + 1
+            return True
+
+    def release(self, name):
+        with self._lock:
+            self._active[name] -= 1
+
+
+def get_concurrency_limiter():
+    """
+    Compteur de concurrence propre à l'instance de l'application
+    """
+    return current_app.extensions.setdefault('concurrency_limiter', ConcurrencyLimiter())
+
+def get_backend():
+    """
+    Instancie le stockage des seaux à la première utilisation
+    """
+    backend = current_app.extensions.get('ratelimit')
+    if backend is None:
+        storage = current_app.config['RATELIMIT_STORAGE_URL']
+        if storage.startswith('sqlite:///'):
+            path = storage[len('sqlite:///'):]
+            if not os.path.isabs(path):
+                os.makedirs(current_app.instance_path, exist_ok=True)
+                path = os.path.join(current_app.instance_path, path)
+            backend = SQLiteBackend(path)
+        else:
+            backend = MemoryBackend()
+        current_app.extensions['ratelimit'] = backend
+    return backend
+
+def queue_wait(header, now=None):
+    """
+    Temps passé dans la file du proxy, d'après l'en-tête X-Request-Start
+    ("t=<secondes>", en millisecondes ou en microsecondes). Retourne None si absent ou illisible.
+    """
+    if not header:
+        return None
+    try:
+        start = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    if start > 1e14:
+        start /= 1e6
+    elif start > 1e11:
+        start /= 1e3
+    now = time.time() if now is None else now
+    return max(0.0, now - start)
+
+def overloaded_response():
+    response = jsonify(message="Service surchargé, réessayez plus tard")
+    return response, 503, {'Retry-After': str(current_app.config['OVERLOAD_RETRY_AFTER'])}
+
+def get_rate_limit_key(name):
+    """
+    Identifie le client : identité JWT si présente, sinon adresse IP
+    """
+    identity = None
+    try:
+        if verify_jwt_in_request(optional=True):
+            identity = get_jwt_identity()
+    except Exception:
+        # Le jeton invalide sera rejeté par jwt_required, on limite par IP
+        pass
+
+    if identity:
+        return f"{name}:user:{identity}"
+    return f"{name}:ip:{request.remote_addr}"
+
+def rate_limit(name, cost=None):
+    """
+    Décorateur limitant le débit (seau à jetons) et la charge d'une route.
+    Les limites sont lues dans RATELIMIT_ROUTES, MAX_QUEUE_WAIT et MAX_CONCURRENT_REQUESTS.
+    `cost` : fonction retournant le nombre de jetons consommés par la requête (1 par défaut),
+    borné à la capacité du seau.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['RATELIMIT_ENABLED']:
+                return fn(*args, **kwargs)
+
+            # Requête restée trop longtemps dans la file : le client a probablement abandonné
+            max_wait = current_app.config['MAX_QUEUE_WAIT']
+            waited = queue_wait(request.headers.get('X-Request-Start'))
+            if max_wait and waited is not None and waited > max_wait:
+                return overloaded_response()
+
+            limiter = get_concurrency_limiter()
+            max_concurrent = current_app.config['MAX_CONCURRENT_REQUESTS'].get(name)
+            if max_concurrent is not None and not limiter.acquire(name, max_concurrent):
+                return overloaded_response()
+
+            try:
+                limits = current_app.config['RATELIMIT_ROUTES'].get(name)
+                if limits:
+                    capacity, refill_rate = limits
+                    tokens = min(cost(), capacity) if cost else 1
+                    allowed, retry_after = get_backend().consume(
+                        get_rate_limit_key(name), capacity, refill_rate, tokens
+                    )
+                    if not allowed:
+                        response = jsonify(message="Trop de requêtes, réessayez plus tard")
+                        return response, 429, {'Retry-After': str(max(1, int(retry_after + 0.999)))}
+
+                return fn(*args, **kwargs)
+            finally:
+                if max_concurrent is not None:
+                    limiter.release(name)
+
+        return wrapper
+    return decorator
@@ -1,11 +1,34 @@
-from flask import request, jsonify, make_response
+import time
+from flask import Blueprint, current_app, request, jsonify, make_response, Response, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app import app, db
-from app.models import User, Product, Order, OrderItem
-from app.utils import admin_required, validate_product_data, validate_order_data, validate_user_data
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import User, Product, Order, OrderItem, OrderEvent, ArchivedOrder
+from app.archive import find_order
+from app.ratelimit import rate_limit
+from app.cache import get_stock_cache, get_catalogue_cache, invalidate_stock
+from app.compression import cached_json_response
+from app.profiler import get_profiler
+from app.checkout import price_orders
+from app.stock import reserve_stock, stock_levels, serialize_products, set_stock, drop_reservations
+from app.schemas import (PRODUCT_UPDATE_SCHEMA, ORDER_STATUS_SCHEMA, ORDER_BATCH_SCHEMA, BULK_STATUS_SCHEMA,
+                         CART_BATCH_SCHEMA, PROFILE_SCHEMA)
+from app.sharding import (use_shard, current_shard, shard_keys, shard_for_user, group_by_shard, for_each_shard,
+                          next_shard_ids, route_to_order_shard)
+from app.utils import (admin_required, validate_product_data, validate_user_data,
+                       record_order_event, parse_cursor, format_cursor, parse_id_list, chunked,
+                       transition_orders, validate_transitions)
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+products_bp = Blueprint('produits', __name__, url_prefix='/api/produits')
+orders_bp = Blueprint('commandes', __name__, url_prefix='/api/commandes')
+cart_bp = Blueprint('panier', __name__, url_prefix='/api/panier')
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 # Routes d'authentification
-@app.route('/api/auth/register', methods=['POST'])
+@auth_bp.route('/register', methods=['POST'])
+@rate_limit('register')
 def register():
     """
     Inscription d'un nouvel utilisateur
@@ -34,7 +57,8 @@ def register():
     
     return jsonify({"message": "Utilisateur créé avec succès", "user": user.to_dict()}), 201
 
-@app.route('/api/auth/login', methods=['POST'])
+@auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 def login():
     """
     Connexion et génération de token JWT
@@ -59,7 +83,7 @@ def login():
     }), 200
 
 # Routes pour les produits
-@app.route('/api/produits', methods=['GET'])
+@products_bp.route('', methods=['GET'])
 def get_products():
     """
     Liste des produits
@@ -68,22 +92,63 @@ def get_products():
     """
     categorie = request.args.get('categorie')
     
-    if categorie:
-        products = Product.query.filter_by(categorie=categorie).all()
-    else:
-        products = Product.query.all()
+    cache = get_catalogue_cache()
+    variants = cache.get(categorie)
+    if variants is None:
+        if categorie:
+            products = Product.query.filter_by(categorie=categorie).all()
+        else:
+            products = Product.query.all()
+        body = jsonify(serialize_products(products)).get_data()
+        # Une catégorie inconnue n'est pas mise en cache (clés arbitraires des clients)
+        variants = cache.set(categorie, body) if products or not categorie else {'identity': body}
+    
+    return cached_json_response(variants), 200
+
+@products_bp.route('/stock', methods=['GET'])
+def get_products_stock():
+    """
+    Stock de plusieurs produits en une requête
+    Paramètres:
+        - ids: Identifiants séparés par des virgules (ex: 1,2,3)
+    """
+    max_ids = current_app.config['STOCK_BATCH_MAX_IDS']
+    product_ids = parse_id_list(request.args.get('ids'), max_ids)
+    if product_ids is None:
+        return jsonify({"errors": {"ids": f"Entre 1 et {max_ids} identifiants entiers séparés par des virgules"}}), 400
+    
+    cache = get_stock_cache()
+    quantities, missing = cache.get_many(product_ids)
+    if missing:
+        # Seules les quantités sont chargées, sans description
+        loaded = stock_levels(missing)
+        cache.set_many(loaded)
+        quantities.update(loaded)
+    
+    threshold = current_app.config['LOW_STOCK_THRESHOLD']
+    stock = [
+        {
+            'id': product_id,
+            'quantite_stock': quantities[product_id],
+            'stock_faible': (quantities[product_id] or 0) <= threshold
+        }
+        for product_id in product_ids if product_id in quantities
+    ]
     
-    return jsonify([product.to_dict() for product in products]), 200
+    return jsonify({
+        "produits": stock,
+        "introuvables": [product_id for product_id in product_ids if product_id not in quantities]
+    }), 200
 
-@app.route('/api/produits/<int:product_id>', methods=['GET'])
+@products_bp.route('/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """
     Détails d'un produit spécifique
     """
     product = Product.query.get_or_404(product_id)
-    return jsonify(product.to_dict()), 200
+    return jsonify(serialize_products([product])[0]), 200
 
-@app.route('/api/produits', methods=['POST'])
+@products_bp.route('', methods=['POST'])
 @admin_required
 def create_product():
     """
@@ -105,10 +170,11 @@ def create_product():
     
     db.session.add(product)
     db.session.commit()
+    get_catalogue_cache().clear()
     
     return jsonify({"message": "Produit créé avec succès", "product": product.to_dict()}), 201
 
-@app.route('/api/produits/<int:product_id>', methods=['PUT'])
+@products_bp.route('/<int:product_id>', methods=['PUT'])
 @admin_required
 def update_product(product_id):
     """
@@ -116,31 +182,23 @@ def update_product(product_id):
     """
     product = Product.query.get_or_404(product_id)
     data = request.get_json()
+    errors = PRODUCT_UPDATE_SCHEMA.validate(data)
     
-    if data.get('nom'):
-        product.nom = data['nom']
-    
-    if 'description' in data:
-        product.description = data['description']
-    
-    if data.get('prix'):
-        if not isinstance(data['prix'], (int, float)) or data['prix'] <= 0:
-            return jsonify({"errors": {"prix": "Le prix doit être un nombre positif"}}), 400
-        product.prix = data['prix']
+    if errors:
+        return jsonify({"errors": errors}), 400
     
+    for field in ('nom', 'description', 'prix', 'categorie'):
+        if field in data:
+            setattr(product, field, data[field])
     if 'quantite_stock' in data:
-        if not isinstance(data['quantite_stock'], int) or data['quantite_stock'] < 0:
-            return jsonify({"errors": {"quantite_stock": "La quantité doit être un nombre entier positif ou nul"}}), 400
-        product.quantite_stock = data['quantite_stock']
-    
-    if data.get('categorie'):
-        product.categorie = data['categorie']
+        set_stock(product, data['quantite_stock'])
     
     db.session.commit()
+    invalidate_stock([product.id])
     
-    return jsonify({"message": "Produit modifié avec succès", "product": product.to_dict()}), 200
+    return jsonify({"message": "Produit modifié avec succès", "product": serialize_products([product])[0]}), 200
 
-@app.route('/api/produits/<int:product_id>', methods=['DELETE'])
+@products_bp.route('/<int:product_id>', methods=['DELETE'])
 @admin_required
 def delete_product(product_id):
     """
@@ -150,15 +208,19 @@ def delete_product(product_id):
     
     db.session.delete(product)
     db.session.commit()
+    drop_reservations(product_id)
+    invalidate_stock([product_id])
     
     return jsonify({"message": "Produit supprimé avec succès"}), 200
 
 # Routes pour les commandes
-@app.route('/api/commandes', methods=['GET'])
+@orders_bp.route('', methods=['GET'])
 @jwt_required()
 def get_orders():
     """
     Liste des commandes (admin voit tout, client voit ses commandes)
+    Paramètres optionnels:
+        - archives: Inclut les commandes archivées si égal à 1
     """
     current_user_email = get_jwt_identity()
     user = User.query.filter_by(email=current_user_email).first()
@@ -166,15 +228,158 @@ def get_orders():
     if not user:
         return jsonify({"message": "Utilisateur non trouvé"}), 404
     
-    if user.role == 'admin':
-        orders = Order.query.all()
+    user_id = None if user.role == 'admin' else user.id
+    
+    def load_orders():
+        query = Order.query.options(selectinload(Order.user), selectinload(Order.items))
+        if user_id is not None:
+            query = query.filter_by(utilisateur_id=user_id)
+        return [order.to_dict() for order in query.order_by(Order.id).all()]
+    
+    if user_id is None:
+        # L'admin voit les commandes de tous les shards, lus en parallèle
+        orders = [order for shard_orders in for_each_shard(load_orders) for order in shard_orders]
+        orders.sort(key=lambda order: (order['date_commande'], order['id']))
     else:
-        orders = Order.query.filter_by(utilisateur_id=user.id).all()
+        with use_shard(shard_for_user(user_id)):
+            orders = load_orders()
+    
+    if request.args.get('archives') == '1':
+        archived = ArchivedOrder.query.options(selectinload(ArchivedOrder.items))
+        if user_id is not None:
+            archived = archived.filter_by(utilisateur_id=user_id)
+        orders = [order.to_dict() for order in archived.order_by(ArchivedOrder.id).all()] + orders
+    
+    return jsonify(orders), 200
+
+def load_shard_changes(user_id, since, limit):
+    """
+    Charge les commandes du shard courant modifiées après la position `since` de son journal.
+    Retourne la nouvelle position, les commandes sérialisées et un indicateur de page incomplète.
+    """
+    query = OrderEvent.query.filter(OrderEvent.id > since)
+    if user_id is not None:
+        query = query.filter_by(utilisateur_id=user_id)
+    events = query.order_by(OrderEvent.id).limit(limit).all()
+    
+    if not events:
+        return since, [], False
+    
+    # Une commande modifiée plusieurs fois n'est renvoyée qu'une fois
+    order_ids = list(dict.fromkeys(event.commande_id for event in events))
+    orders = (Order.query
+              .options(selectinload(Order.user), selectinload(Order.items))
+              .filter(Order.id.in_(order_ids))
+              .all())
+    orders_by_id = {order.id: order.to_dict() for order in orders}
+    changes = [orders_by_id[order_id] for order_id in order_ids if order_id in orders_by_id]
+    
+    return events[-1].id, changes, len(events) == limit
+
+def load_order_changes(user_id, is_admin, cursor, limit):
+    """
+    Charge les commandes modifiées après le curseur (une position par shard).
+    Un client ne lit que le journal de son shard, l'admin ceux de tous les shards.
+    Retourne le nouveau curseur, les commandes sérialisées et un indicateur de page incomplète.
+    """
+    keys = shard_keys() or [None]
+    cursor = list(cursor)
+    
+    if is_admin:
+        def load():
+            index = keys.index(current_shard.get())
+            return index, load_shard_changes(None, cursor[index], limit)
+        results = for_each_shard(load)
+    else:
+        shard = shard_for_user(user_id)
+        index = keys.index(shard)
+        with use_shard(shard):
+            results = [(index, load_shard_changes(user_id, cursor[index], limit))]
+    
+    changes, has_more = [], False
+    for index, (position, shard_changes, shard_has_more) in results:
+        cursor[index] = position
+        changes.extend(shard_changes)
+        has_more = has_more or shard_has_more
+    
+    return cursor, changes, has_more
+
+@orders_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_order_changes():
+    """
+    Synchronisation incrémentale des commandes
+    Paramètres optionnels:
+        - since: Curseur renvoyé par l'appel précédent (0 par défaut)
+    """
+    current_user_email = get_jwt_identity()
+    user = User.query.filter_by(email=current_user_email).first()
+    
+    if not user:
+        return jsonify({"message": "Utilisateur non trouvé"}), 404
+    
+    since = parse_cursor(request.args.get('since'), len(shard_keys()) or 1)
+    if since is None:
+        return jsonify({"errors": {"since": "Curseur invalide"}}), 400
     
-    return jsonify([order.to_dict() for order in orders]), 200
+    cursor, changes, has_more = load_order_changes(
+        user.id, user.role == 'admin', since, current_app.config['ORDER_CHANGES_PAGE_SIZE']
+    )
+    
+    return jsonify({"cursor": format_cursor(cursor), "has_more": has_more, "commandes": changes}), 200
+
+@orders_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_order_changes():
+    """
+    Flux Server-Sent Events des changements de commandes
+    Le curseur est repris depuis l'en-tête Last-Event-ID ou le paramètre `since`.
+    Désactivé par défaut (ORDER_STREAM_ENABLED) : chaque client occupe un worker.
+    """
+    if not current_app.config['ORDER_STREAM_ENABLED']:
+        return jsonify({"message": "Flux désactivé, utilisez /api/commandes/changes"}), 404
+    
+    current_user_email = get_jwt_identity()
+    user = User.query.filter_by(email=current_user_email).first()
+    
+    if not user:
+        return jsonify({"message": "Utilisateur non trouvé"}), 404
+    
+    since = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('since'), len(shard_keys()) or 1)
+    if since is None:
+        return jsonify({"errors": {"since": "Curseur invalide"}}), 400
+    
+    user_id, is_admin = user.id, user.role == 'admin'
+    page_size = current_app.config['ORDER_CHANGES_PAGE_SIZE']
+    poll_interval = current_app.config['ORDER_STREAM_POLL_INTERVAL']
+    deadline = time.monotonic() + current_app.config['ORDER_STREAM_MAX_DURATION']
+    
+    def generate(cursor):
+        yield f"retry: {int(poll_interval * 1000)}\n\n"
+        while True:
+            cursor, changes, has_more = load_order_changes(user_id, is_admin, cursor, page_size)
+            # Terminer la transaction pour voir les écritures des autres workers
+            db.session.rollback()
+            
+            if changes:
+                yield f"id: {format_cursor(cursor)}\nevent: commandes\ndata: {current_app.json.dumps(changes)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            
+            if has_more:
+                continue
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+    
+    response = Response(stream_with_context(generate(since)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-@app.route('/api/commandes/<int:order_id>', methods=['GET'])
+@orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
+@route_to_order_shard
 def get_order(order_id):
     """
     Détails d'une commande spécifique
@@ -182,7 +387,9 @@ def get_order(order_id):
     current_user_email = get_jwt_identity()
     user = User.query.filter_by(email=current_user_email).first()
     
-    order = Order.query.get_or_404(order_id)
+    order = find_order(order_id)
+    if not order:
+        return jsonify({"message": "Commande non trouvée"}), 404
     
     # Vérifier si l'utilisateur a le droit de voir cette commande
     if user.role != 'admin' and order.utilisateur_id != user.id:
@@ -190,7 +397,8 @@ def get_order(order_id):
     
     return jsonify(order.to_dict()), 200
 
-@app.route('/api/commandes', methods=['POST'])
+@orders_bp.route('', methods=['POST'])
+@rate_limit('create_order')
 @jwt_required()
 def create_order():
     """
@@ -200,69 +408,223 @@ def create_order():
     user = User.query.filter_by(email=current_user_email).first()
     
     data = request.get_json()
-    errors = validate_order_data(data)
     
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
-    # Créer la commande
-    order = Order(
-        utilisateur_id=user.id,
-        adresse_livraison=data['adresse_livraison']
-    )
-    
-    db.session.add(order)
-    db.session.flush()  # Pour obtenir l'ID de la commande avant de créer les lignes
-    
-    # Ajouter les articles de la commande
-    for item_data in data['items']:
-        product = Product.query.get(item_data['produit_id'])
-        
-        if not product:
-            db.session.rollback()
-            return jsonify({"errors": {f"items.produit_id": f"Produit {item_data['produit_id']} non trouvé"}}), 400
-        
-        # Vérifier le stock
-        if product.quantite_stock < item_data['quantite']:
+    # Les commandes sont écrites dans le shard de l'utilisateur, sans écrire dans la base
+    # principale : le stock est prélevé sur la réserve du shard (voir app/stock.py)
+    shard = shard_for_user(user.id)
+    # Validation (schéma, produits, stock) et chiffrage
+    result = price_orders([data], shard=shard)[0]
+    if result['errors']:
+        return jsonify({"errors": result['errors']}), 400
+    
+    quantities = {}
+    for line in result['lignes']:
+        quantities[line['produit_id']] = quantities.get(line['produit_id'], 0) + line['quantite']
+    
+    with use_shard(shard):
+        # Le stock peut avoir changé depuis le chiffrage : la décrémentation est conditionnelle
+        if not reserve_stock(quantities):
             db.session.rollback()
-            return jsonify({"errors": {f"items.quantite": f"Stock insuffisant pour {product.nom}"}}), 400
+            return jsonify({"message": "Le stock a changé pendant la commande, réessayez"}), 409
         
-        # Créer la ligne de commande
-        order_item = OrderItem(
-            commande_id=order.id,
-            produit_id=product.id,
-            quantite=item_data['quantite'],
-            prix_unitaire=product.prix
+        ids = iter(next_shard_ids(shard, 1 + len(result['lignes'])))
+        order = Order(
+            id=next(ids),
+            utilisateur_id=user.id,
+            adresse_livraison=data['adresse_livraison']
         )
+        order.items = [
+            OrderItem(
+                id=next(ids),
+                produit_id=line['produit_id'],
+                quantite=line['quantite'],
+                prix_unitaire=line['prix_unitaire']
+            )
+            for line in result['lignes']
+        ]
         
-        # Mettre à jour le stock
-        product.quantite_stock -= item_data['quantite']
+        db.session.add(order)
+        db.session.flush()
+        record_order_event(order)
+        db.session.commit()
+        invalidate_stock(quantities)
         
-        db.session.add(order_item)
+        return jsonify({"message": "Commande créée avec succès", "order": order.to_dict()}), 201
+
+def orders_in_request():
+    """
+    Nombre de commandes du corps {"commandes": [...]} (1 sinon) : jetons consommés par les routes groupées
+    """
+    data = request.get_json(silent=True)
+    orders_data = data.get('commandes') if isinstance(data, dict) else None
+    return len(orders_data) if isinstance(orders_data, list) and orders_data else 1
+
+@orders_bp.route('/batch', methods=['POST'])
+@rate_limit('create_order_batch', cost=orders_in_request)
+@jwt_required()
+def create_orders_batch():
+    """
+    Création de plusieurs commandes en une transaction
+    Corps: {"commandes": [{"adresse_livraison": ..., "items": [...]}, ...]}
+    Aucune commande n'est créée si l'une d'elles est invalide.
+    """
+    current_user_email = get_jwt_identity()
+    user = User.query.filter_by(email=current_user_email).first()
     
-    db.session.commit()
+    if not user:
+        return jsonify({"message": "Utilisateur non trouvé"}), 404
+    
+    data = request.get_json()
+    errors = ORDER_BATCH_SCHEMA.validate(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    orders_data = data['commandes']
+    
+    shard = shard_for_user(user.id)
+    results = price_orders(orders_data, shard=shard)
+    # Erreurs de produit ou de stock, au même format que celles du schéma
+    errors = {
+        f"commandes[{result['index']}].{path}": message
+        for result in results for path, message in result['errors'].items()
+    }
+    if errors:
+        return jsonify({"errors": errors}), 400
     
-    return jsonify({"message": "Commande créée avec succès", "order": order.to_dict()}), 201
+    quantities = {}
+    for result in results:
+        for line in result['lignes']:
+            quantities[line['produit_id']] = quantities.get(line['produit_id'], 0) + line['quantite']
+    
+    with use_shard(shard):
+        # Le stock peut avoir changé depuis le chiffrage : la décrémentation est conditionnelle
+        if not reserve_stock(quantities):
+            db.session.rollback()
+            return jsonify({"message": "Le stock a changé pendant la commande, réessayez"}), 409
+        
+        ids = iter(next_shard_ids(shard, sum(1 + len(result['lignes']) for result in results)))
+        orders = []
+        for order_data, result in zip(orders_data, results):
+            order = Order(
+                id=next(ids),
+                utilisateur_id=user.id,
+                adresse_livraison=order_data['adresse_livraison']
+            )
+            order.items = [
+                OrderItem(
+                    id=next(ids),
+                    produit_id=line['produit_id'],
+                    quantite=line['quantite'],
+                    prix_unitaire=line['prix_unitaire']
+                )
+                for line in result['lignes']
+            ]
+            orders.append(order)
+        
+        db.session.add_all(orders)
+        db.session.flush()
+        for order in orders:
+            record_order_event(order)
+        created = [
+            {"id": order.id, "statut": order.statut, "total": result['total']}
+            for order, result in zip(orders, results)
+        ]
+        db.session.commit()
+    
+    invalidate_stock(quantities)
+    
+    return jsonify({"message": f"{len(created)} commande(s) créée(s) avec succès", "commandes": created}), 201
 
-@app.route('/api/commandes/<int:order_id>', methods=['PATCH'])
+@orders_bp.route('/<int:order_id>', methods=['PATCH'])
 @admin_required
+@route_to_order_shard
 def update_order_status(order_id):
     """
     Modification du statut d'une commande (admin uniquement)
     """
     order = Order.query.get_or_404(order_id)
     data = request.get_json()
+    errors = ORDER_STATUS_SCHEMA.validate(data)
     
-    if 'statut' not in data or data['statut'] not in ['en_attente', 'validée', 'expédiée', 'annulée']:
-        return jsonify({"errors": {"statut": "Statut invalide"}}), 400
+    if errors:
+        return jsonify({"errors": errors}), 400
     
-    order.statut = data['statut']
-    db.session.commit()
+    orders = [(order.id, order.utilisateur_id, order.statut)]
+    errors = validate_transitions(orders, data['statut'])
+    if errors:
+        return jsonify({"errors": {"statut": errors[str(order.id)]}}), 400
+    
+    if order.statut != data['statut']:
+        product_ids = transition_orders(orders, data['statut'])
+        if product_ids is None:
+            db.session.rollback()
+            return jsonify({"message": "La commande a été modifiée entre-temps, réessayez"}), 409
+        db.session.commit()
+        invalidate_stock(product_ids)
     
     return jsonify({"message": "Statut de la commande modifié avec succès", "order": order.to_dict()}), 200
 
-@app.route('/api/commandes/<int:order_id>/lignes', methods=['GET'])
+@orders_bp.route('/bulk', methods=['PATCH'])
+@admin_required
+def update_orders_status_bulk():
+    """
+    Modification du statut de plusieurs commandes en une transaction (admin uniquement)
+    Corps: {"ids": [1, 2, 3], "statut": "expédiée"}
+    Aucune commande n'est modifiée si l'une d'elles est introuvable ou sa transition invalide.
+    Avec le sharding, chaque shard est validé dans sa propre transaction SQLite.
+    """
+    data = request.get_json()
+    errors = BULK_STATUS_SCHEMA.validate(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    order_ids = list(dict.fromkeys(data['ids']))
+    statut = data['statut']
+    
+    orders_by_shard = {}
+    for shard, shard_order_ids in group_by_shard(order_ids).items():
+        with use_shard(shard):
+            orders_by_shard[shard] = []
+            for chunk in chunked(shard_order_ids):
+                orders_by_shard[shard].extend(db.session.execute(
+                    select(Order.id, Order.utilisateur_id, Order.statut).where(Order.id.in_(chunk))
+                ).all())
+    
+    orders = [order for shard_orders in orders_by_shard.values() for order in shard_orders]
+    errors = validate_transitions(orders, statut)
+    found = {order_id for order_id, _, _ in orders}
+    for order_id in order_ids:
+        if order_id not in found:
+            errors[str(order_id)] = "Commande non trouvée"
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    changed = 0
+    product_ids = set()
+    for shard, shard_orders in orders_by_shard.items():
+        changes = [order for order in shard_orders if order[2] != statut]
+        if not changes:
+            continue
+        with use_shard(shard):
+            shard_product_ids = transition_orders(changes, statut)
+        if shard_product_ids is None:
+            db.session.rollback()
+            return jsonify({"message": "Des commandes ont été modifiées entre-temps, réessayez"}), 409
+        product_ids.update(shard_product_ids)
+        changed += len(changes)
+    
+    if changed:
+        db.session.commit()
+        invalidate_stock(product_ids)
+    
+    return jsonify({
+        "message": "Statut des commandes modifié avec succès",
+        "statut": statut,
+        "modifiees": changed
+    }), 200
+
+@orders_bp.route('/<int:order_id>/lignes', methods=['GET'])
 @jwt_required()
+@route_to_order_shard
 def get_order_items(order_id):
     """
     Consultation des lignes d'une commande spécifique
@@ -270,18 +632,111 @@ def get_order_items(order_id):
     current_user_email = get_jwt_identity()
     user = User.query.filter_by(email=current_user_email).first()
     
-    order = Order.query.get_or_404(order_id)
+    order = find_order(order_id)
+    if not order:
+        return jsonify({"message": "Commande non trouvée"}), 404
     
     # Vérifier si l'utilisateur a le droit de voir cette commande
     if user.role != 'admin' and order.utilisateur_id != user.id:
         return jsonify({"message": "Accès refusé"}), 403
     
-    # Récupérer les lignes de la commande
-    order_items = OrderItem.query.filter_by(commande_id=order_id).all()
+    # Récupérer les lignes de la commande (actives ou archivées)
+    order_items = order.items
     
     return jsonify({
         "commande_id": order_id,
         "statut": order.statut,
         "total": sum(item.prix_unitaire * item.quantite for item in order_items),
         "lignes": [item.to_dict() for item in order_items]
-    }), 200
\ No newline at end of file
+    }), 200
+
+# Routes d'administration
+@admin_bp.route('/profile', methods=['GET'])
+@admin_required
+def get_profile():
+    """
+    Profil agrégé de tous les workers (admin uniquement)
+    Paramètres optionnels:
+        - format: 'collapsed' pour les piles au format flamegraph (texte)
+        - endpoint: Limite les piles à un endpoint
+        - top: Nombre de requêtes SQL renvoyées
+    """
+    profiler = get_profiler()
+    endpoints, stacks, sql = profiler.collect()
+    
+    endpoint = request.args.get('endpoint')
+    if endpoint:
+        stacks = {stack: count for stack, count in stacks.items() if stack.split(';', 1)[0] == endpoint}
+    
+    if request.args.get('format') == 'collapsed':
+        body = ''.join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+        return Response(body, mimetype='text/plain'), 200
+    
+    top = max(0, request.args.get('top', current_app.config['PROFILE_TOP_SQL'], type=int))
+    top_sql = sorted(sql.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    control = profiler.read_control()
+    
+    return jsonify({
+        "actif": control['actif'],
+        "taux": control['taux'],
+        "endpoints": endpoints,
+        "echantillons": sum(stacks.values()),
+        "sql": [
+            {"requete": statement, "executions": count, "temps_total_ms": round(total, 3)}
+            for statement, (count, total) in top_sql
+        ]
+    }), 200
+
+@admin_bp.route('/profile', methods=['PUT'])
+@admin_required
+def update_profile():
+    """
+    Active ou désactive le profilage sur tous les workers (admin uniquement)
+    """
+    data = request.get_json()
+    errors = PROFILE_SCHEMA.validate(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    control = get_profiler().write_control(actif=data['actif'], taux=data.get('taux', 10))
+    
+    return jsonify({"message": "Profilage mis à jour", "actif": control['actif'], "taux": control['taux']}), 200
+
+@admin_bp.route('/profile', methods=['DELETE'])
+@admin_required
+def reset_profile():
+    """
+    Efface les données de profilage de tous les workers (admin uniquement)
+    """
+    get_profiler().reset()
+    return jsonify({"message": "Données de profilage effacées"}), 200
+
+# Routes du panier
+@cart_bp.route('/valider', methods=['POST'])
+@rate_limit('validate_cart', cost=orders_in_request)
+def validate_cart():
+    """
+    Vérification du stock et des totaux sans rien enregistrer
+    Corps: un panier {"items": [...]} ou plusieurs {"commandes": [{"items": [...]}, ...]}
+    """
+    data = request.get_json()
+    if isinstance(data, dict) and 'commandes' not in data:
+        orders_data = [data]
+    else:
+        # Seules les erreurs de l'enveloppe sont refusées : celles des commandes sont
+        # rapportées dans leur résultat
+        errors = {
+            path: message for path, message in CART_BATCH_SCHEMA.validate(data).items()
+            if not path.startswith('commandes[')
+        }
+        if errors:
+            return jsonify({"errors": errors}), 400
+        orders_data = data['commandes']
+    
+    results = price_orders(orders_data, require_address=False)
+    
+    return jsonify({
+        "valide": not any(result['errors'] for result in results),
+        "total": sum(result['total'] for result in results),
+        "commandes": results
+    }), 200
@@ -0,0 +1,330 @@
+"""
+Schémas déclaratifs des données reçues par l'API.
+
+Chaque schéma est compilé une seule fois, à l'import, en une fonction Python générée
+(sans appel de fonction par champ ni double lecture des clés). Les erreurs sont
+indexées par chemin : 'prix', 'items[3].quantite', ...
+"""
+from abc import ABC, abstractmethod
+from copy import copy
+from app.models import ORDER_STATUSES
+
+MISSING = object()
+
+
+class Field(ABC):
+    """
+    Champ d'un schéma : `invalid(var)` retourne l'expression Python vraie si la valeur est invalide
+    """
+    def __init__(self, message, required=False, nullable=False):
+        self.message = message
+        self.required = required
+        self.nullable = nullable
+
+    @abstractmethod
+    def invalid(self, var, constant):
+        """
+        `constant(value)` enregistre une valeur et retourne le nom sous lequel le code généré la lit
+        """
+
+
+class String(Field):
+    def __init__(self, message, required=False, nullable=False, min_length=1):
+        super().__init__(message, required, nullable)
+        self.min_length = min_length
+
+    def invalid(self, var, constant):
+        expr = f"{var}.__class__ is not str"
+        if self.min_length == 1:
+            expr += f" or not {var}"
+        elif self.min_length > 1:
+            expr += f" or len({var}) < {self.min_length}"
+        return expr
+
+
+class Integer(Field):
+    def __init__(self, message, required=False, nullable=False, minimum=None):
+        super().__init__(message, required, nullable)
+        self.minimum = minimum
+
+    def invalid(self, var, constant):
+        expr = f"{var}.__class__ is not int"
+        if self.minimum is not None:
+            expr += f" or {var} < {self.minimum}"
+        return expr
+
+
+class Number(Field):
+    def __init__(self, message, required=False, nullable=False, exclusive_minimum=None, maximum=None):
+        super().__init__(message, required, nullable)
+        self.exclusive_minimum = exclusive_minimum
+        self.maximum = maximum
+
+    def invalid(self, var, constant):
+        expr = f"({var}.__class__ is not int and {var}.__class__ is not float)"
+        if self.exclusive_minimum is not None:
+            expr += f" or {var} <= {self.exclusive_minimum}"
+        if self.maximum is not None:
+            expr += f" or {var} > {self.maximum}"
+        return expr
+
+
+class Boolean(Field):
+    def invalid(self, var, constant):
+        return f"{var}.__class__ is not bool"
+
+
+class Choice(Field):
+    def __init__(self, choices, message, required=False, nullable=False):
+        super().__init__(message, required, nullable)
+        self.choices = frozenset(choices)
+
+    def invalid(self, var, constant):
+        return f"{var}.__class__ is not str or {var} not in {constant(self.choices)}"
+
+
+class List(Field):
+    """
+    Liste d'objets validés par un Schema, ou de valeurs validées par un Field
+    (`List(Integer(...), ...)`) ; les erreurs des éléments sont indexées
+    """
+    def __init__(self, items, message, required=False, min_items=1, max_items=None):
+        super().__init__(message, required)
+        self.items = items
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def invalid(self, var, constant):
+        expr = f"{var}.__class__ is not list or len({var}) < {self.min_items}"
+        if self.max_items is not None:
+            expr += f" or len({var}) > {self.max_items}"
+        return expr
+
+
+class Schema:
+    """
+    Schéma d'un objet JSON, compilé à la construction.
+    `name` et `message` décrivent l'erreur retournée si les données ne sont pas un objet.
+    """
+    def __init__(self, name, message, fields):
+        self.name = name
+        self.message = message
+        self.fields = fields
+        self._check, self._check_many, self._validate = compile_schema(self)
+
+    def partial(self):
+        """
+        Variante où aucun champ n'est requis (modification partielle)
+        """
+        fields = {name: copy(field) for name, field in self.fields.items()}
+        for field in fields.values():
+            field.required = False
+        return Schema(self.name, self.message, fields)
+
+    def validate(self, data):
+        """
+        Retourne le dictionnaire {chemin: message} des erreurs (vide si valide)
+        """
+        if self._check(data):
+            return {}
+        return self._validate(data, {}, '')
+
+    __call__ = validate
+
+    def validate_many(self, items):
+        """
+        Valide un tableau d'objets avec le même validateur compilé.
+        Retourne les erreurs des seuls éléments invalides : {index: {chemin: message}}.
+        """
+        validate = self._validate
+        return {index: validate(items[index], {}, '') for index in self._check_many(items)}
+
+
+def compile_schema(schema):
+    """
+    Génère le code source des fonctions du schéma puis les compile :
+    - check(data) : contrôle rapide, s'arrête à la première erreur ;
+    - check_many(items) : index des éléments d'un tableau qui échouent à check() ;
+    - validate(data, errors, path) : collecte toutes les erreurs avec leur chemin,
+      appelée seulement si check() a échoué.
+    """
+    constants = {'MISSING': MISSING}
+
+    def constant(value):
+        name = f"C{len(constants)}"
+        constants[name] = value
+        return name
+
+    lines = ['def check(data):']
+    emit_check(schema, 'data', lines, 1, constant, 0, 'return False')
+    lines.append('    return True')
+    # Contrôle d'un tableau, sans appel de fonction par élément
+    lines += [
+        'def check_many(items):',
+        '    invalid = []',
+        '    for index, data in enumerate(items):',
+    ]
+    emit_check(schema, 'data', lines, 2, constant, 0, 'invalid.append(index); continue')
+    lines.append('    return invalid')
+    lines += [
+        'def validate(data, errors, path):',
+        "    prefix = path + '.' if path else ''",
+    ]
+    emit_validate(schema, 'data', None, lines, 1, constant, depth=0)
+    lines.append('    return errors')
+
+    namespace = dict(constants)
+    exec(compile('\n'.join(lines), f'<schema {schema.name}>', 'exec'), namespace)
+    return namespace['check'], namespace['check_many'], namespace['validate']
+
+def field_condition(name, field, value, constant):
+    """
+    Lit le champ dans `value` ; retourne l'expression vraie si sa valeur est invalide
+    """
+    if not name.isidentifier():
+        raise ValueError(f"Nom de champ invalide : {name!r}")
+    # MISSING et None échouent tous deux au contrôle de type d'un champ requis
+    condition = field.invalid(value, constant)
+    if not field.required:
+        guard = f"{value} is not MISSING"
+        if field.nullable:
+            guard += f" and {value} is not None"
+        condition = f"{guard} and ({condition})"
+    return condition
+
+def emit_check(schema, var, lines, indent, constant, depth, fail):
+    """
+    Émet le contrôle rapide de l'objet `var` ; `fail` est l'instruction exécutée au premier échec.
+    Dans les listes imbriquées, l'échec sort de la boucle et est propagé par un indicateur.
+    """
+    pad = '    ' * indent
+    value = f"v{depth}"
+    lines.append(f"{pad}if {var}.__class__ is not dict:")
+    lines.append(f"{pad}    {fail}")
+
+    for name, field in schema.fields.items():
+        default = '' if field.required else ', MISSING'
+        lines.append(f"{pad}{value} = {var}.get({name!r}{default})")
+        lines.append(f"{pad}if {field_condition(name, field, value, constant)}:")
+        lines.append(f"{pad}    {fail}")
+
+        if isinstance(field, List):
+            item, ok = f"item{depth}", f"ok{depth}"
+            lines.append(f"{pad}{ok} = True")
+            lines.append(f"{pad}for {item} in {value}:")
+            if isinstance(field.items, Schema):
+                emit_check(field.items, item, lines, indent + 1, constant, depth + 1, f"{ok} = False; break")
+            else:
+                lines.append(f"{pad}    if {field.items.invalid(item, constant)}:")
+                lines.append(f"{pad}        {ok} = False; break")
+            lines.append(f"{pad}if not {ok}:")
+            lines.append(f"{pad}    {fail}")
+
+def emit_validate(schema, var, path, lines, indent, constant, depth):
+    """
+    `path` : gabarit f-string du chemin de l'objet, None pour la racine (chemin passé à l'appel)
+    """
+    pad = '    ' * indent
+    value = f"v{depth}"
+    prefix = '{prefix}' if path is None else path + '.'
+    object_key = f"path or {constant(schema.name)}" if path is None else f'f"{path}"'
+
+    lines.append(f"{pad}if {var}.__class__ is not dict:")
+    lines.append(f"{pad}    errors[{object_key}] = {constant(schema.message)}")
+    lines.append(f"{pad}else:")
+    pad += '    '
+
+    for name, field in schema.fields.items():
+        default = '' if field.required else ', MISSING'
+        lines.append(f"{pad}{value} = {var}.get({name!r}{default})")
+        lines.append(f"{pad}if {field_condition(name, field, value, constant)}:")
+        lines.append(f'{pad}    errors[f"{prefix}{name}"] = {constant(field.message)}')
+
+        if isinstance(field, List):
+            # Validation des éléments seulement si la liste elle-même est valide
+            item, index = f"item{depth}", f"i{depth}"
+            item_path = f"{prefix}{name}[{{{index}}}]"
+            lines.append(f"{pad}elif {value}.__class__ is list:")
+            lines.append(f"{pad}    for {index}, {item} in enumerate({value}):")
+            if isinstance(field.items, Schema):
+                emit_validate(field.items, item, item_path, lines, indent + 3, constant, depth + 1)
+            else:
+                lines.append(f"{pad}        if {field.items.invalid(item, constant)}:")
+                lines.append(f'{pad}            errors[f"{item_path}"] = {constant(field.items.message)}')
+
+
+# Schémas de l'API
+
+USER_REGISTRATION_SCHEMA = Schema('utilisateur', "L'utilisateur doit être un objet", {
+    'email': String("L'email est requis", required=True),
+    'mot_de_passe': String("Le mot de passe doit contenir au moins 6 caractères", required=True, min_length=6),
+    'nom': String("Le nom est requis", required=True),
+    'role': Choice(('client', 'admin'), "Rôle invalide"),
+})
+
+USER_LOGIN_SCHEMA = Schema('utilisateur', "L'utilisateur doit être un objet", {
+    'email': String("L'email est requis", required=True),
+    'mot_de_passe': String("Le mot de passe est requis", required=True),
+})
+
+PRODUCT_SCHEMA = Schema('produit', "Le produit doit être un objet", {
+    'nom': String("Le nom du produit est requis", required=True),
+    'description': String("La description doit être un texte", nullable=True, min_length=0),
+    'prix': Number("Le prix doit être un nombre positif", required=True, exclusive_minimum=0),
+    'categorie': String("La catégorie est requise", required=True),
+    'quantite_stock': Integer("La quantité en stock doit être un nombre entier positif ou nul", minimum=0),
+})
+
+PRODUCT_UPDATE_SCHEMA = PRODUCT_SCHEMA.partial()
+
+CATEGORY_SCHEMA = Schema('categorie', "La catégorie doit être un objet", {
+    'nom': String("Le nom de la catégorie est requis", required=True),
+})
+
+ORDER_ITEM_SCHEMA = Schema('article', "L'article doit être un objet", {
+    'produit_id': Integer("L'identifiant du produit est requis", required=True, minimum=1),
+    'quantite': Integer("La quantité doit être un nombre entier positif", required=True, minimum=1),
+})
+
+# Bornes du travail d'une requête : articles par commande, commandes par lot
+# (POST /api/commandes/batch, /api/panier/valider), identifiants par PATCH /api/commandes/bulk
+ORDER_MAX_ITEMS = 100
+ORDER_BATCH_MAX = 100
+BULK_STATUS_MAX_IDS = 10000
+
+ORDER_SCHEMA = Schema('commande', "La commande doit être un objet", {
+    'adresse_livraison': String("L'adresse de livraison est requise", required=True),
+    'items': List(ORDER_ITEM_SCHEMA, f"La commande doit contenir entre 1 et {ORDER_MAX_ITEMS} articles",
+                  required=True, max_items=ORDER_MAX_ITEMS),
+})
+
+# Panier : une commande sans adresse de livraison
+CART_SCHEMA = Schema('commande', "La commande doit être un objet", {
+    'items': ORDER_SCHEMA.fields['items'],
+})
+
+ORDER_BATCH_SCHEMA = Schema('lot', "Le lot doit être un objet", {
+    'commandes': List(ORDER_SCHEMA, f"Entre 1 et {ORDER_BATCH_MAX} commandes sont requises",
+                      required=True, max_items=ORDER_BATCH_MAX),
+})
+
+CART_BATCH_SCHEMA = Schema('panier', "Le panier doit être un objet", {
+    'commandes': List(CART_SCHEMA, f"Entre 1 et {ORDER_BATCH_MAX} commandes sont requises",
+                      required=True, max_items=ORDER_BATCH_MAX),
+})
+
+ORDER_STATUS_SCHEMA = Schema('statut', "Statut invalide", {
+    'statut': Choice(ORDER_STATUSES, "Statut invalide", required=True),
+})
+
+BULK_STATUS_SCHEMA = Schema('statut', "Statut invalide", {
+    'ids': List(Integer("L'identifiant de commande doit être un entier positif", minimum=1),
+                f"Entre 1 et {BULK_STATUS_MAX_IDS} identifiants de commande entiers",
+                required=True, max_items=BULK_STATUS_MAX_IDS),
+    'statut': ORDER_STATUS_SCHEMA.fields['statut'],
+})
+
+PROFILE_SCHEMA = Schema('profilage', "Le corps doit être un objet", {
+    'actif': Boolean("Le champ actif doit être un booléen", required=True),
+    'taux': Number("Le taux doit être un pourcentage entre 0 et 100", exclusive_minimum=0, maximum=100),
+})
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import sqlalchemy as sa
+from flask import current_app
+from flask_sqlalchemy.session import Session
+
+# Shard courant pour les tables marquées info={'sharded': True} (Order, OrderItem)
+current_shard = ContextVar('current_shard', default=None)
+
+# Compteur d'identifiants des commandes et de leurs lignes, présent dans chaque shard
+# (une seule ligne, incrémentée sur place)
+shard_id_sequence = sa.Table(
+    'shard_id_sequence', sa.MetaData(),
+    sa.Column('id', sa.Integer, primary_key=True)
+)
+
+
+class ShardedSession(Session):
+    """
+    Session qui envoie les tables de commandes vers le shard sélectionné par use_shard().
+    Hors d'un bloc use_shard, elles restent sur la base principale.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = current_shard.get()
+        if bind is None and shard is not None and targets_sharded_table(mapper, clause):
+            return self._db.engines[shard]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def targets_sharded_table(mapper, clause):
+    table = None
+    if mapper is not None:
+        table = sa.inspect(mapper).local_table
+    elif isinstance(clause, sa.Table):
+        table = clause
+    elif isinstance(clause, sa.sql.dml.UpdateBase):
+        table = clause.table
+    return table is not None and table.info.get('sharded', False)
+
+def shard_keys():
+    """
+    Clés de bind des shards configurés (liste vide : sharding désactivé)
+    """
+    return current_app.config['ORDER_SHARDS']
+
+def shard_for_user(user_id):
+    keys = shard_keys()
+    return keys[user_id % len(keys)] if keys else None
+
+def shard_for_order(order_id):
+    # L'identifiant global encode l'index du shard (voir next_shard_ids)
+    keys = shard_keys()
+    return keys[order_id % len(keys)] if keys else None
+
+@contextmanager
+def use_shard(key):
+    """
+    Oriente les requêtes sur Order et OrderItem vers le shard `key` (sans effet si None)
+    """
+    token = current_shard.set(key)
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+def route_to_order_shard(fn):
+    """
+    Décorateur de vue : exécute la vue dans le shard de la commande `order_id`
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with use_shard(shard_for_order(kwargs['order_id'])):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def next_shard_ids(key, count):
+    """
+    Alloue `count` identifiants (commandes ou lignes) uniques sur l'ensemble des shards,
+    en une seule requête : compteur local du shard * nombre de shards + index du shard.
+    Retourne des None sans sharding (auto-incrément classique).
+    """
+    if key is None:
+        return [None] * count
+    db = current_app.extensions['sqlalchemy']
+    keys = shard_keys()
+    connection = db.session.connection(bind_arguments={'bind': db.engines[key]})
+    last_id = connection.execute(
+        shard_id_sequence.update().values(id=shard_id_sequence.c.id + count).returning(shard_id_sequence.c.id)
+    ).scalar_one()
+    return [local_id * len(keys) + keys.index(key) for local_id in range(last_id - count + 1, last_id + 1)]
+
+def group_by_shard(order_ids):
+    """
+    Répartit des identifiants de commande par shard
+    """
+    groups = {}
+    for order_id in order_ids:
+        groups.setdefault(shard_for_order(order_id), []).append(order_id)
+    return groups
+
+def for_each_shard(fn):
+    """
+    Exécute fn() sur chaque shard en parallèle, chacun avec son contexte d'application
+    et sa session. Sans sharding, fn() est appelée une fois sur la base principale.
+    """
+    keys = shard_keys()
+    if not keys:
+        return [fn()]
+
+    app = current_app._get_current_object()
+
+    def run(key):
+        with app.app_context():
+            with use_shard(key):
+                return fn()
+
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        return list(pool.map(run, keys))
+
+def create_shard_tables():
+    """
+    Crée les tables de commandes et le compteur d'identifiants dans chaque shard
+    """
+    db = current_app.extensions['sqlalchemy']
+    tables = [table for table in db.metadata.sorted_tables if table.info.get('sharded')]
+    for key in shard_keys():
+        engine = db.engines[key]
+        db.metadata.create_all(engine, tables=tables)
+        shard_id_sequence.create(engine, checkfirst=True)
+        with engine.begin() as conn:
+            if conn.execute(sa.select(shard_id_sequence.c.id)).first() is None:
+                conn.execute(shard_id_sequence.insert().values(id=0))
@@ -0,0 +1,222 @@
+"""
+Stock des produits.
+
+Sans sharding, le stock est la colonne Product.quantite_stock de la base principale.
+Avec sharding, chaque shard dispose d'une réserve (StockReservation) prélevée par blocs de
+STOCK_RESERVATION_BLOCK unités sur Product.quantite_stock, qui devient le stock non réservé :
+créer ou annuler une commande n'écrit que dans le shard de l'utilisateur, et la base
+principale n'est écrite qu'une fois par bloc.
+Stock d'un produit = stock non réservé + réserves de tous les shards.
+"""
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Product, StockReservation
+from app.sharding import current_shard, shard_keys, for_each_shard, use_shard
+
+products = Product.__table__
+reservations = StockReservation.__table__
+
+def unreserved_stock(product_ids):
+    rows = db.session.execute(
+        select(Product.id, Product.quantite_stock).where(Product.id.in_(product_ids))
+    )
+    return {product_id: quantite or 0 for product_id, quantite in rows}
+
+def shard_reservations(product_ids):
+    """
+    Réserves du shard courant
+    """
+    rows = db.session.execute(
+        select(StockReservation.produit_id, StockReservation.quantite)
+        .where(StockReservation.produit_id.in_(product_ids))
+    )
+    return dict(rows.all())
+
+def stock_levels(product_ids):
+    """
+    Stock total des produits existants : {id: quantité}
+    """
+    levels = unreserved_stock(product_ids)
+    if shard_keys() and levels:
+        for reserved in for_each_shard(lambda: shard_reservations(list(levels))):
+            for product_id, quantite in reserved.items():
+                if product_id in levels:
+                    levels[product_id] += quantite
+    return levels
+
+def available_stock(wanted, shard=None):
+    """
+    Stock des produits de `wanted` ({id: quantité demandée}) pour des commandes créées dans `shard`.
+    Si la réserve du shard suffit, la base principale n'est pas lue ; sinon, ou si `shard` est None,
+    retourne le stock total (stock non réservé et réserves des autres shards peuvent être prélevés).
+    """
+    if shard is not None:
+        with use_shard(shard):
+            reserved = shard_reservations(list(wanted))
+        levels = {product_id: reserved.get(product_id, 0) for product_id in wanted}
+        if all(levels[product_id] >= quantite for product_id, quantite in wanted.items()):
+            return levels
+    return stock_levels(list(wanted))
+
+def serialize_products(items):
+    """
+    Produits sérialisés avec leur stock total
+    """
+    items = list(items)
+    if not shard_keys():
+        return [product.to_dict() for product in items]
+    levels = stock_levels([product.id for product in items])
+    return [dict(product.to_dict(), quantite_stock=levels[product.id]) for product in items]
+
+def engine_for(key):
+    # None désigne la base principale (stock non réservé)
+    return db.engines[key] if key is not None else db.engine
+
+def take_stock(source, product_id, wanted):
+    """
+    Prélève jusqu'à `wanted` unités dans le stock non réservé (source None) ou la réserve
+    d'un shard, dans sa propre transaction. Retourne la quantité prélevée.
+    """
+    table = products if source is None else reservations
+    key_column = table.c.id if source is None else table.c.produit_id
+    quantity_column = table.c.quantite_stock if source is None else table.c.quantite
+    try:
+        with engine_for(source).begin() as conn:
+            current = conn.execute(select(quantity_column).where(key_column == product_id)).scalar() or 0
+            taken = min(current, wanted)
+            if taken <= 0:
+                return 0
+            result = conn.execute(
+                update(table)
+                .where(key_column == product_id, quantity_column >= taken)
+                .values({quantity_column: quantity_column - taken})
+            )
+            return taken if result.rowcount == 1 else 0
+    except OperationalError:
+        # Source verrouillée : on passe à la suivante
+        return 0
+
+def give_stock(target, product_id, quantite, conn):
+    """
+    Crédite le stock non réservé (target None) ou la réserve d'un shard
+    """
+    if target is None:
+        conn.execute(
+            update(products).where(products.c.id == product_id)
+            .values(quantite_stock=products.c.quantite_stock + quantite)
+        )
+    else:
+        statement = insert(reservations).values(produit_id=product_id, quantite=quantite)
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[reservations.c.produit_id],
+            set_={'quantite': reservations.c.quantite + statement.excluded.quantite}
+        ))
+
+def refill_reservation(shard, product_id, needed):
+    """
+    Approvisionne la réserve de `shard` d'au moins `needed` unités, d'un bloc entier si possible,
+    en prélevant sur le stock non réservé puis sur les réserves des autres shards.
+    Chaque transfert prélève puis crédite dans deux transactions ; si le crédit échoue, le
+    prélèvement est restitué : le stock peut être sous-estimé, jamais survendu.
+    Retourne la quantité ajoutée.
+    """
+    block = current_app.config['STOCK_RESERVATION_BLOCK']
+    added = 0
+    for source in [None] + [key for key in shard_keys() if key != shard]:
+        if added >= needed:
+            break
+        wanted = max(needed - added, block) if source is None else needed - added
+        taken = take_stock(source, product_id, wanted)
+        if not taken:
+            continue
+        try:
+            with engine_for(shard).begin() as conn:
+                give_stock(shard, product_id, taken, conn)
+        except Exception:
+            with engine_for(source).begin() as conn:
+                give_stock(source, product_id, taken, conn)
+            raise
+        added += taken
+    return added
+
+def decrement_stock(table, key_column, quantity_column, quantities):
+    for product_id, quantite in quantities.items():
+        result = db.session.execute(
+            update(table)
+            .where(key_column == product_id, quantity_column >= quantite)
+            .values({quantity_column: quantity_column - quantite})
+        )
+        if result.rowcount != 1:
+            return False
+    return True
+
+def reserve_stock(quantities):
+    """
+    Décrémente le stock utilisable par le shard courant, uniquement s'il est suffisant.
+    Avec sharding, doit être la première écriture de la transaction du shard : si la réserve
+    ne suffit pas, la transaction est annulée pour libérer le shard pendant le réapprovisionnement.
+    Retourne False si un produit n'a plus le stock requis (l'appelant doit annuler la transaction).
+    """
+    shard = current_shard.get()
+    if shard is None:
+        return decrement_stock(products, products.c.id, products.c.quantite_stock, quantities)
+
+    if decrement_stock(reservations, reservations.c.produit_id, reservations.c.quantite, quantities):
+        return True
+    db.session.rollback()
+    reserved = shard_reservations(list(quantities))
+    for product_id, quantite in quantities.items():
+        missing = quantite - reserved.get(product_id, 0)
+        if missing > 0:
+            refill_reservation(shard, product_id, missing)
+    return decrement_stock(reservations, reservations.c.produit_id, reservations.c.quantite, quantities)
+
+def release_stock(quantities):
+    """
+    Remet du stock disponible (annulation), dans la transaction en cours :
+    dans la réserve du shard courant avec sharding, dans Product sinon
+    """
+    if not quantities:
+        return
+    if current_shard.get() is None:
+        db.session.execute(
+            update(products)
+            .where(products.c.id == bindparam('produit_id'))
+            .values(quantite_stock=products.c.quantite_stock + bindparam('quantite')),
+            [{'produit_id': product_id, 'quantite': quantite} for product_id, quantite in quantities.items()]
+        )
+        return
+    statement = insert(reservations)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[reservations.c.produit_id],
+            set_={'quantite': reservations.c.quantite + statement.excluded.quantite}
+        ),
+        [{'produit_id': product_id, 'quantite': quantite} for product_id, quantite in quantities.items()]
+    )
+
+def set_stock(product, quantite):
+    """
+    Fixe le stock total d'un produit (à appeler avant le commit).
+    Les réserves des shards sont remises à zéro pendant que la base principale est verrouillée,
+    ce qui bloque les réapprovisionnements concurrents.
+    """
+    product.quantite_stock = quantite
+    keys = shard_keys()
+    if not keys:
+        return
+    db.session.flush()
+    for key in keys:
+        with db.engines[key].begin() as conn:
+            conn.execute(update(reservations).where(reservations.c.produit_id == product.id).values(quantite=0))
+
+def drop_reservations(product_id):
+    """
+    Supprime les réserves d'un produit supprimé
+    """
+    for key in shard_keys():
+        with db.engines[key].begin() as conn:
+            conn.execute(reservations.delete().where(reservations.c.produit_id == product_id))
@@ -1,7 +1,13 @@
+from datetime import datetime
 from functools import wraps
 from flask import jsonify, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from app.models import User
+from sqlalchemy import func, insert, select, update
+from app import db
+from app.models import User, Order, OrderItem, OrderEvent, ORDER_TRANSITIONS
+from app.schemas import (PRODUCT_SCHEMA, CATEGORY_SCHEMA, ORDER_SCHEMA, CART_SCHEMA,
+                         USER_REGISTRATION_SCHEMA, USER_LOGIN_SCHEMA)
+from app.stock import release_stock
 
 def admin_required(fn):
     """
@@ -31,77 +37,138 @@ def admin_required(fn):
     
     return wrapper
 
-def validate_product_data(data):
+def record_order_event(order):
     """
-    Valide les données d'un produit
+    Ajoute un événement au journal des commandes (à appeler avant le commit)
     """
-    errors = {}
+    event = OrderEvent(
+        commande_id=order.id,
+        utilisateur_id=order.utilisateur_id,
+        statut=order.statut or 'en_attente'
+    )
+    db.session.add(event)
+    return event
+
+def chunked(values, size=500):
+    """
+    Découpe une liste pour rester sous la limite de paramètres de SQLite
+    """
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def transition_orders(orders, statut):
+    """
+    Passe des commandes au statut `statut` en SQL, sans les charger en objets.
+    `orders` est une liste de tuples (id, utilisateur_id, statut actuel) dont les
+    transitions ont déjà été validées. L'annulation remet le stock des produits.
+    Retourne les identifiants des produits dont le stock a changé, ou None si une
+    commande a changé de statut entre-temps (l'appelant doit alors annuler la transaction).
+    """
+    by_status = {}
+    for order_id, _, current in orders:
+        by_status.setdefault(current, []).append(order_id)
     
-    if not data.get('nom'):
-        errors['nom'] = "Le nom du produit est requis"
+    # La condition sur le statut actuel protège contre les modifications concurrentes
+    for current, order_ids in by_status.items():
+        for chunk in chunked(order_ids):
+            result = db.session.execute(
+                update(Order)
+                .where(Order.id.in_(chunk), Order.statut == current)
+                .values(statut=statut)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(chunk):
+                return None
     
-    if not data.get('prix') or not isinstance(data.get('prix'), (int, float)) or data.get('prix') <= 0:
-        errors['prix'] = "Le prix doit être un nombre positif"
+    # Quantités à remettre en stock, calculées sur les lignes puis appliquées en une requête
+    # groupée (dans la réserve du shard avec sharding, sans écrire dans la base principale)
+    restored = {}
+    if statut == 'annulée':
+        for chunk in chunked([order_id for order_id, _, _ in orders]):
+            rows = db.session.execute(
+                select(OrderItem.produit_id, func.sum(OrderItem.quantite))
+                .where(OrderItem.commande_id.in_(chunk))
+                .group_by(OrderItem.produit_id)
+            )
+            for product_id, quantite in rows:
+                restored[product_id] = restored.get(product_id, 0) + quantite
     
-    if not data.get('categorie'):
-        errors['categorie'] = "La catégorie est requise"
+    release_stock(restored)
     
-    if 'quantite_stock' in data and (not isinstance(data['quantite_stock'], int) or data['quantite_stock'] < 0):
-        errors['quantite_stock'] = "La quantité en stock doit être un nombre entier positif ou nul"
+    now = datetime.utcnow()
+    db.session.execute(insert(OrderEvent), [
+        {'commande_id': order_id, 'utilisateur_id': user_id, 'statut': statut, 'date_evenement': now}
+        for order_id, user_id, _ in orders
+    ])
     
+    return set(restored)
+
+def validate_transitions(orders, statut):
+    """
+    Vérifie les transitions de statut, retourne les erreurs par commande
+    """
+    errors = {}
+    for order_id, _, current in orders:
+        if current != statut and statut not in ORDER_TRANSITIONS.get(current, ()):
+            errors[str(order_id)] = f"Transition {current} -> {statut} non autorisée"
     return errors
 
+def parse_cursor(value, shards=1):
+    """
+    Convertit un curseur de synchronisation en liste d'entiers, un par shard :
+    "12" sans sharding, "12.7" avec deux shards. Absent ou "0" : que des zéros ; invalide : None.
+    """
+    if value in (None, '', '0'):
+        return [0] * shards
+    parts = str(value).split('.')
+    if len(parts) != shards:
+        return None
+    try:
+        cursor = [int(part) for part in parts]
+    except ValueError:
+        return None
+    return cursor if all(position >= 0 for position in cursor) else None
+
+def format_cursor(cursor):
+    """
+    Inverse de parse_cursor (entier sans sharding)
+    """
+    return cursor[0] if len(cursor) == 1 else '.'.join(str(position) for position in cursor)
+
+def parse_id_list(value, max_ids):
+    """
+    Convertit une liste d'identifiants séparés par des virgules ("1,2,3")
+    Retourne None si la liste est vide, invalide ou trop longue.
+    """
+    try:
+        ids = list(dict.fromkeys(int(part) for part in (value or '').split(',') if part.strip()))
+    except ValueError:
+        return None
+    if not ids or len(ids) > max_ids:
+        return None
+    return ids
+
+def validate_product_data(data):
+    """
+    Valide les données d'un produit
+    """
+    return PRODUCT_SCHEMA.validate(data)
+
 def validate_category_data(data):
     """
     Valide les données d'une catégorie
     """
-    errors = {}
-    
-    if not data.get('nom'):
-        errors['nom'] = "Le nom de la catégorie est requis"
-    
-    return errors
+    return CATEGORY_SCHEMA.validate(data)
 
-def validate_order_data(data):
+def validate_order_data(data, require_address=True):
     """
     Valide les données d'une commande
+    `require_address=False` pour la validation d'un panier sans adresse.
     """
-    errors = {}
-    
-    if not data.get('adresse_livraison'):
-        errors['adresse_livraison'] = "L'adresse de livraison est requise"
-    
-    if not data.get('items') or not isinstance(data.get('items'), list) or len(data.get('items')) == 0:
-        errors['items'] = "Au moins un article est requis dans la commande"
-    else:
-        for i, item in enumerate(data.get('items')):
-            if not item.get('produit_id'):
-                errors[f'items[{i}].produit_id'] = "L'identifiant du produit est requis"
-            if not item.get('quantite') or not isinstance(item.get('quantite'), int) or item.get('quantite') <= 0:
-                errors[f'items[{i}].quantite'] = "La quantité doit être un nombre entier positif"
-    
-    return errors
+    return (ORDER_SCHEMA if require_address else CART_SCHEMA).validate(data)
 
 def validate_user_data(data, is_registration=True):
     """
     Valide les données d'un utilisateur
     """
-    errors = {}
-    
-    if is_registration:
-        if not data.get('email'):
-            errors['email'] = "L'email est requis"
-        
-        if not data.get('mot_de_passe') or len(data.get('mot_de_passe')) < 6:
-            errors['mot_de_passe'] = "Le mot de passe doit contenir au moins 6 caractères"
-        
-        if not data.get('nom'):
-            errors['nom'] = "Le nom est requis"
-    else:
-        if not data.get('email'):
-            errors['email'] = "L'email est requis"
-        
-        if not data.get('mot_de_passe'):
-            errors['mot_de_passe'] = "Le mot de passe est requis"
-    
-    return errors
\ No newline at end of file
+    return (USER_REGISTRATION_SCHEMA if is_registration else USER_LOGIN_SCHEMA).validate(data)
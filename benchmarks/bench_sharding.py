@@ -0,0 +1,90 @@
+"""
+Débit de création de commandes : une base SQLite contre N shards.
+
+Chaque processus simule un worker gunicorn qui crée des commandes pour ses propres clients.
+Avec sharding, la base principale n'est plus écrite qu'au prélèvement d'un bloc de stock
+(STOCK_RESERVATION_BLOCK) : le gain de débit apparaît quand les écritures sur la base unique
+sont le goulot (plusieurs cœurs, fsync lents), pas sur une machine à un seul cœur.
+
+    python benchmarks/bench_sharding.py --workers 4 --orders 200 --shards 4
+"""
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, Product
+from app.sharding import create_shard_tables
+from config import testing_config
+
+def setup(directory, shards, users):
+    app = create_app(testing_config(directory, shards))
+    with app.app_context():
+        db.create_all()
+        create_shard_tables()
+        for i in range(users):
+            user = User(email=f'client{i}@example.com', nom=f'Client {i}')
+            user.password_hash = '-'
+            db.session.add(user)
+        db.session.add(Product(nom='Produit', categorie='Test', prix=10.0, quantite_stock=10 ** 9))
+        db.session.commit()
+
+def worker(args):
+    directory, shards, worker_index, users_per_worker, orders = args
+    app = create_app(testing_config(directory, shards))
+    client = app.test_client()
+    with app.app_context():
+        tokens = [
+            create_access_token(identity=f'client{worker_index * users_per_worker + i}@example.com')
+            for i in range(users_per_worker)
+        ]
+
+    errors = 0
+    for i in range(orders):
+        response = client.post('/api/commandes', headers={'Authorization': f'Bearer {tokens[i % len(tokens)]}'}, json={
+            'adresse_livraison': '1 rue du Test',
+            'items': [{'produit_id': 1, 'quantite': 1}]
+        })
+        if response.status_code != 201:
+            errors += 1
+    return errors
+
+def write_count(path):
+    # Compteur de modifications de l'en-tête SQLite, incrémenté à chaque transaction d'écriture
+    with open(path, 'rb') as f:
+        return struct.unpack('>I', f.read(28)[24:28])[0]
+
+def run(workers, orders, shards, users_per_worker, directory=None):
+    with tempfile.TemporaryDirectory(dir=directory) as directory:
+        setup(directory, shards, workers * users_per_worker)
+        main = os.path.join(directory, 'main.db')
+        writes = write_count(main)
+        jobs = [(directory, shards, w, users_per_worker, orders) for w in range(workers)]
+        with Pool(workers) as pool:
+            start = time.perf_counter()
+            errors = sum(pool.map(worker, jobs))
+            elapsed = time.perf_counter() - start
+        writes = write_count(main) - writes
+    total = workers * orders
+    label = f'{shards} shard(s)' if shards else 'base unique'
+    print(f"{label:12} {total} commandes en {elapsed:.2f} s : {total / elapsed:.0f} commandes/s, "
+          f"{writes} écriture(s) de la base principale, {errors} erreur(s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=200, help="commandes par worker")
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--users', type=int, default=8, help="clients par worker")
+    parser.add_argument('--dir', help="répertoire des bases (disque de production pour mesurer le coût des fsync)")
+    args = parser.parse_args()
+
+    run(args.workers, args.orders, 0, args.users, args.dir)
+    run(args.workers, args.orders, args.shards, args.users, args.dir)
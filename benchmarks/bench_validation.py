@@ -0,0 +1,106 @@
+"""
+Validation des données : validateurs écrits à la main contre schémas compilés.
+
+Mesure une commande de N articles et un lot de N produits.
+
+    python benchmarks/bench_validation.py --items 10000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas import Schema, List, ORDER_SCHEMA, ORDER_ITEM_SCHEMA, PRODUCT_SCHEMA
+
+# Validateurs d'origine (app/utils.py avant les schémas), recopiés tels quels comme référence
+def legacy_validate_order_data(data):
+    """
+    Valide les données d'une commande
+    """
+    errors = {}
+    
+    if not data.get('adresse_livraison'):
+        errors['adresse_livraison'] = "L'adresse de livraison est requise"
+    
+    if not data.get('items') or not isinstance(data.get('items'), list) or len(data.get('items')) == 0:
+        errors['items'] = "Au moins un article est requis dans la commande"
+    else:
+        for i, item in enumerate(data.get('items')):
+            if not item.get('produit_id'):
+                errors[f'items[{i}].produit_id'] = "L'identifiant du produit est requis"
+            if not item.get('quantite') or not isinstance(item.get('quantite'), int) or item.get('quantite') <= 0:
+                errors[f'items[{i}].quantite'] = "La quantité doit être un nombre entier positif"
+    
+    return errors
+
+def legacy_validate_product_data(data):
+    """
+    Valide les données d'un produit
+    """
+    errors = {}
+    
+    if not data.get('nom'):
+        errors['nom'] = "Le nom du produit est requis"
+    
+    if not data.get('prix') or not isinstance(data.get('prix'), (int, float)) or data.get('prix') <= 0:
+        errors['prix'] = "Le prix doit être un nombre positif"
+    
+    if not data.get('categorie'):
+        errors['categorie'] = "La catégorie est requise"
+    
+    if 'quantite_stock' in data and (not isinstance(data['quantite_stock'], int) or data['quantite_stock'] < 0):
+        errors['quantite_stock'] = "La quantité en stock doit être un nombre entier positif ou nul"
+    
+    return errors
+
+# Même schéma que ORDER_SCHEMA, sans la limite de ORDER_MAX_ITEMS articles
+BENCH_ORDER_SCHEMA = Schema('commande', ORDER_SCHEMA.message, dict(
+    ORDER_SCHEMA.fields,
+    items=List(ORDER_ITEM_SCHEMA, ORDER_SCHEMA.fields['items'].message, required=True),
+))
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def report(label, legacy_ms, compiled_ms):
+    print(f"{label:<28} avant: {legacy_ms:8.2f} ms   schéma: {compiled_ms:8.2f} ms   x{legacy_ms / compiled_ms:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    order = {
+        'adresse_livraison': '1 rue de la Paix, Paris',
+        'items': [{'produit_id': i + 1, 'quantite': i % 5 + 1} for i in range(args.items)]
+    }
+    invalid_order = {
+        'adresse_livraison': '1 rue de la Paix, Paris',
+        'items': [{'produit_id': i + 1, 'quantite': 0 if i % 10 == 0 else 1} for i in range(args.items)]
+    }
+    products = [
+        {'nom': f'Produit {i}', 'description': '', 'prix': 9.99, 'categorie': 'Test', 'quantite_stock': i}
+        for i in range(args.items)
+    ]
+
+    assert legacy_validate_order_data(order) == BENCH_ORDER_SCHEMA.validate(order) == {}
+    assert legacy_validate_order_data(invalid_order) == BENCH_ORDER_SCHEMA.validate(invalid_order)
+
+    print(f"{args.items} articles / produits, meilleur temps sur {args.repeat} essais")
+    report("commande valide", best_of(lambda: legacy_validate_order_data(order), args.repeat),
+           best_of(lambda: BENCH_ORDER_SCHEMA.validate(order), args.repeat))
+    report("commande invalide (10 %)", best_of(lambda: legacy_validate_order_data(invalid_order), args.repeat),
+           best_of(lambda: BENCH_ORDER_SCHEMA.validate(invalid_order), args.repeat))
+    report("lot de produits", best_of(lambda: [legacy_validate_product_data(p) for p in products], args.repeat),
+           best_of(lambda: PRODUCT_SCHEMA.validate_many(products), args.repeat))
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,96 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///digimarket.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Base d'archive des commandes terminées (par défaut la base principale)
+    ARCHIVE_DATABASE_URL = os.environ.get('ARCHIVE_DATABASE_URL')
+    
+    # Sharding des commandes par utilisateur : ORDER_SHARD_URLS="sqlite:///s0.db,sqlite:///s1.db"
+    # Le nombre de shards ne doit plus changer une fois des commandes créées.
+    ORDER_SHARD_URLS = [url for url in (os.environ.get('ORDER_SHARD_URLS') or '').split(',') if url]
+    ORDER_RETENTION_DAYS = int(os.environ.get('ORDER_RETENTION_DAYS') or 365)
+    ORDER_ARCHIVE_BATCH_SIZE = 500
+    # Unités de stock transférées à la fois de Product.quantite_stock vers la réserve d'un shard
+    STOCK_RESERVATION_BLOCK = 100
+    
     # Configuration JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    
+    # Synchronisation incrémentale des commandes
+    ORDER_CHANGES_PAGE_SIZE = 500
+    # Le flux SSE occupe un worker (ou un thread) pendant ORDER_STREAM_MAX_DURATION :
+    # à n'activer qu'avec des workers gunicorn gthread ou gevent
+    ORDER_STREAM_ENABLED = os.environ.get('ORDER_STREAM_ENABLED', '0') == '1'
+    ORDER_STREAM_POLL_INTERVAL = 2  # secondes entre deux lectures du journal
+    ORDER_STREAM_MAX_DURATION = 60  # le client se reconnecte avec Last-Event-ID
+    
+    # Limitation de débit : (capacité du seau, jetons rechargés par seconde)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+    # 'memory' (par worker) ou 'sqlite:///ratelimit.db' (partagé entre workers)
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or 'memory'
+    RATELIMIT_ROUTES = {
+        'register': (5, 0.1),
+        'login': (10, 0.5),
+        'create_order': (20, 2.0),
+        # Routes groupées : un jeton par commande du corps
+        'create_order_batch': (100, 2.0),
+        'validate_cart': (200, 20.0),
+    }
+    # Attente maximale (secondes) dans la file du proxy, mesurée via l'en-tête X-Request-Start
+    # (nginx : proxy_set_header X-Request-Start "t=${msec}";) ; 0 désactive
+    MAX_QUEUE_WAIT = float(os.environ.get('MAX_QUEUE_WAIT') or 2)
+    # Requêtes simultanées par worker au-delà desquelles on répond 503 ;
+    # doivent rester inférieures au nombre de threads gunicorn (--threads, voir Dockerfile)
+    MAX_CONCURRENT_REQUESTS = {
+        'register': 2,
+        'login': 2,
+        'create_order': 4,
+        'create_order_batch': 2,
+        'validate_cart': 4,
+    }
+    OVERLOAD_RETRY_AFTER = 1  # secondes
+    # Nombre de proxies de confiance devant l'application (nginx : 1) : l'IP du client, qui
+    # identifie les requêtes anonymes, est lue dans X-Forwarded-For ; 0 si l'API est exposée directement
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS') or 0)
+    
+    # Endpoint de stock groupé
+    STOCK_BATCH_MAX_IDS = 200
+    STOCK_CACHE_TTL = 5  # secondes, borne la latence entre workers
+    STOCK_CACHE_MAX_SIZE = 10000
+    LOW_STOCK_THRESHOLD = 5
+    CATALOGUE_CACHE_TTL = 30  # secondes
+    CATALOGUE_CACHE_MAX_SIZE = 100  # catalogue complet + une entrée par catégorie
+    
+    # Compression des réponses (gzip, brotli si le paquet est installé)
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024  # octets
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_MIMETYPES = ['application/json']
+    
+    # Profilage à la demande (/api/admin/profile)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')  # partagé entre workers, instance/profiles par défaut
+    PROFILE_SAMPLE_INTERVAL = 0.005  # secondes entre deux échantillons de pile
+    PROFILE_CONTROL_CHECK_INTERVAL = 1  # secondes entre deux lectures de l'état partagé
+    PROFILE_FLUSH_INTERVAL = 1  # secondes entre deux écritures des agrégats du worker (heartbeat)
+    PROFILE_WORKER_TIMEOUT = 30  # secondes sans heartbeat après lesquelles un worker est ignoré
+    PROFILE_TOP_SQL = 20
+    
+    # Les tailles maximales des lots (commandes, articles, identifiants) sont déclarées avec
+    # les schémas de validation, dans app/schemas.py
+
+def testing_config(directory, shards=0, in_memory=False):
+    """
+    Configuration des tests et des benchmarks, bases dans `directory`.
+    `in_memory` : base principale et archive en mémoire (propres à une connexion, donc sans shards).
+    """
+    def url(name):
+        return 'sqlite:///:memory:' if in_memory else f"sqlite:///{os.path.join(directory, name + '.db')}"
+    return {
+        'SQLALCHEMY_DATABASE_URI': url('main'),
+        'SQLALCHEMY_BINDS': {'archive': url('archive')},
+        'ORDER_SHARD_URLS': [f"sqlite:///{os.path.join(directory, f'shard{i}.db')}" for i in range(shards)],
+        'TESTING': True,
+        'JWT_SECRET_KEY': 'test-key',
+        'RATELIMIT_ENABLED': False,
+        'PROFILE_DIR': os.path.join(directory, 'profiles'),
+    }
@@ -1,7 +1,11 @@
-from app import app, db
+from app import create_app, db
+from app.sharding import create_shard_tables
+
+app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        create_shard_tables()
         
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
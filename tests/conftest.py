@@ -0,0 +1,73 @@
+import pytest
+import json
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User
+from app.sharding import create_shard_tables
+from config import testing_config
+
+@pytest.fixture
+def app(request, tmp_path):
+    # Chaque test dispose de sa propre application et de sa base en mémoire,
+    # ce qui permet l'exécution en parallèle (pytest -n auto).
+    # Paramétrable (indirect=True) : {'shards': 2} place les bases dans des fichiers de tmp_path,
+    # {'config': {...}} surcharge la configuration lue par create_app.
+    params = getattr(request, 'param', {})
+    shards = params.get('shards', 0)
+    app = create_app(dict(testing_config(str(tmp_path), shards=shards, in_memory=not shards), **params.get('config', {})))
+    
+    with app.app_context():
+        db.create_all()
+        create_shard_tables()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def admin_token(app, client):
+    # Créer un utilisateur admin
+    admin = User(
+        email='admin@example.com',
+        nom='Admin User',
+        role='admin'
+    )
+    admin.set_password('admin123')
+    with app.app_context():
+        db.session.add(admin)
+        db.session.commit()
+    
+    # Obtenir le token
+    response = client.post('/api/auth/login', json={
+        'email': 'admin@example.com',
+        'mot_de_passe': 'admin123'
+    })
+    return json.loads(response.data)['token']
+
+@pytest.fixture
+def user_token(app, client):
+    # Créer un utilisateur normal
+    user = User(
+        email='user@example.com',
+        nom='Regular User'
+    )
+    user.set_password('user123')
+    with app.app_context():
+        db.session.add(user)
+        db.session.commit()
+    
+    # Obtenir le token
+    response = client.post('/api/auth/login', json={
+        'email': 'user@example.com',
+        'mot_de_passe': 'user123'
+    })
+    return json.loads(response.data)['token']
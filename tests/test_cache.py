@@ -0,0 +1,33 @@
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import CatalogueCache
+
+def test_catalogue_cache_max_size():
+    """
+    Test l'éviction des entrées du catalogue au-delà de la taille maximale
+    """
+    cache = CatalogueCache(ttl=30, max_size=3)
+    for key in ('a', 'b', 'c', 'd'):
+        cache.set(key, key.encode())
+    
+    assert cache.get('a') is None
+    assert [cache.get(key)['identity'] for key in ('b', 'c', 'd')] == [b'b', b'c', b'd']
+    assert len(cache._entries) == 3
+
+def test_catalogue_cache_evicts_expired_first():
+    """
+    Test que les entrées expirées sont évincées avant les plus anciennes
+    """
+    cache = CatalogueCache(ttl=30, max_size=2)
+    cache.set('a', b'a')
+    cache.ttl = -1
+    cache.set('b', b'b')
+    cache.ttl = 30
+    cache.set('c', b'c')
+    
+    assert cache.get('a')['identity'] == b'a'
+    assert 'b' not in cache._entries
@@ -0,0 +1,18 @@
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.compression import negotiate_encoding, supported_encodings
+
+def test_negotiate_encoding():
+    """
+    Test la négociation de l'en-tête Accept-Encoding
+    """
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('deflate') is None
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding('gzip;q=0') is None
+    assert negotiate_encoding('*') == supported_encodings()[0]
+    assert negotiate_encoding('br, gzip') == supported_encodings()[0]
@@ -6,20 +6,8 @@ import os
 # Ajout du chemin parent au PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import db, app
-from app.models import User, Product, Order, OrderItem
-
-@pytest.fixture
-def client():
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['TESTING'] = True
-    
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
+from app import db
+from app.models import User, Product, Order, OrderItem, OrderEvent
 
 @pytest.fixture
 def sample_user():
@@ -93,7 +81,7 @@ def test_product_to_dict(sample_product):
     assert product_dict['categorie'] == 'Ordinateurs'
     assert product_dict['quantite_stock'] == 10
 
-def test_new_order(client, sample_user, sample_product):
+def test_new_order(app, client, sample_user, sample_product):
     """
     Test la création d'une nouvelle commande
     """
@@ -111,7 +99,7 @@ def test_new_order(client, sample_user, sample_product):
         assert order.statut == 'en_attente'
         assert order.adresse_livraison == '123 Test Street'
 
-def test_order_to_dict(client, sample_user, sample_product):
+def test_order_to_dict(app, client, sample_user, sample_product):
     """
     Test la sérialisation d'une commande
     """
@@ -133,7 +121,7 @@ def test_order_to_dict(client, sample_user, sample_product):
         assert order_dict['adresse_livraison'] == '123 Test Street'
         assert order_dict['total'] == 0  # pas d'items encore
 
-def test_order_item(client, sample_user, sample_product):
+def test_order_item(app, client, sample_user, sample_product):
     """
     Test la création d'une ligne de commande
     """
@@ -165,3 +153,21 @@ def test_order_item(client, sample_user, sample_product):
         # Test le calcul du total de la commande
         order_dict = order.to_dict()
         assert order_dict['total'] == 1999.98  # 2 * 999.99
+
+def test_order_event_ids_not_reused(app):
+    """
+    Test que les ids du journal (curseurs clients) ne sont jamais réutilisés
+    """
+    with app.app_context():
+        first = OrderEvent(commande_id=1, utilisateur_id=1, statut='en_attente')
+        db.session.add(first)
+        db.session.commit()
+        first_id = first.id
+        
+        db.session.delete(first)
+        db.session.commit()
+        
+        second = OrderEvent(commande_id=1, utilisateur_id=1, statut='validée')
+        db.session.add(second)
+        db.session.commit()
+        assert second.id > first_id
@@ -0,0 +1,79 @@
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+from app.ratelimit import consume_token, queue_wait, MemoryBackend, SQLiteBackend
+
+def test_consume_token_refill():
+    """
+    Test le rechargement du seau à jetons
+    """
+    allowed, tokens, retry_after = consume_token(None, 0, 0, capacity=2, refill_rate=1)
+    assert allowed and tokens == 1
+    
+    allowed, tokens, retry_after = consume_token(0, 0, 0, capacity=2, refill_rate=1)
+    assert not allowed
+    assert retry_after == 1
+    
+    # Le seau ne dépasse jamais sa capacité
+    allowed, tokens, retry_after = consume_token(0, 0, 100, capacity=2, refill_rate=1)
+    assert allowed and tokens == 1
+    
+    # Requête groupée : plusieurs jetons à la fois
+    allowed, tokens, retry_after = consume_token(1, 0, 0, capacity=5, refill_rate=1, cost=3)
+    assert not allowed
+    assert retry_after == 2
+    allowed, tokens, retry_after = consume_token(None, 0, 0, capacity=5, refill_rate=1, cost=3)
+    assert allowed and tokens == 2
+
+def test_memory_backend():
+    """
+    Test le stockage en mémoire des seaux
+    """
+    backend = MemoryBackend()
+    assert backend.consume('login:ip:1.2.3.4', 1, 0.001)[0]
+    assert not backend.consume('login:ip:1.2.3.4', 1, 0.001)[0]
+    assert backend.consume('login:ip:5.6.7.8', 1, 0.001)[0]
+
+def test_sqlite_backend_shared(tmp_path):
+    """
+    Test le partage des seaux entre deux instances (workers) via SQLite
+    """
+    path = str(tmp_path / 'ratelimit.db')
+    worker1 = SQLiteBackend(path)
+    worker2 = SQLiteBackend(path)
+    
+    assert worker1.consume('create_order:user:a@example.com', 2, 0.001)[0]
+    assert worker2.consume('create_order:user:a@example.com', 2, 0.001)[0]
+    assert not worker1.consume('create_order:user:a@example.com', 2, 0.001)[0]
+
+def test_sqlite_backend_locked(tmp_path):
+    """
+    Test qu'une base verrouillée laisse passer la requête au lieu de lever une erreur
+    """
+    path = str(tmp_path / 'ratelimit.db')
+    backend = SQLiteBackend(path, timeout=0.05)
+    
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        assert backend.consume('login:ip:1.2.3.4', 1, 0.001) == (True, 0)
+    finally:
+        other.execute('ROLLBACK')
+    
+    assert backend.consume('login:ip:1.2.3.4', 1, 0.001)[0]
+    assert not backend.consume('login:ip:1.2.3.4', 1, 0.001)[0]
+
+def test_queue_wait():
+    """
+    Test la lecture de l'en-tête X-Request-Start (secondes, millisecondes, microsecondes)
+    """
+    assert queue_wait('t=1000.5', now=1001.0) == 0.5
+    assert queue_wait('t=1600000000000', now=1600000001.5) == 1.5
+    assert queue_wait('1600000000000000', now=1600000000.25) == 0.25
+    assert queue_wait('t=2000', now=1000) == 0
+    assert queue_wait(None) is None
+    assert queue_wait('abc') is None
@@ -6,60 +6,9 @@ import os
 # Ajout du chemin parent au PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db
-from app.models import User, Product, Order, OrderItem
-
-@pytest.fixture
-def client():
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['TESTING'] = True
-    app.config['JWT_SECRET_KEY'] = 'test-key'
-    
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
-
-@pytest.fixture
-def admin_token(client):
-    # Créer un utilisateur admin
-    admin = User(
-        email='admin@example.com',
-        nom='Admin User',
-        role='admin'
-    )
-    admin.set_password('admin123')
-    with app.app_context():
-        db.session.add(admin)
-        db.session.commit()
-    
-    # Obtenir le token
-    response = client.post('/api/auth/login', json={
-        'email': 'admin@example.com',
-        'mot_de_passe': 'admin123'
-    })
-    return json.loads(response.data)['token']
-
-@pytest.fixture
-def user_token(client):
-    # Créer un utilisateur normal
-    user = User(
-        email='user@example.com',
-        nom='Regular User'
-    )
-    user.set_password('user123')
-    with app.app_context():
-        db.session.add(user)
-        db.session.commit()
-    
-    # Obtenir le token
-    response = client.post('/api/auth/login', json={
-        'email': 'user@example.com',
-        'mot_de_passe': 'user123'
-    })
-    return json.loads(response.data)['token']
+from app import db
+from app.models import User, Product, Order, OrderItem, OrderEvent
+
 
 def test_register(client):
     """
@@ -76,7 +25,7 @@ def test_register(client):
     assert data['user']['email'] == 'new@example.com'
     assert data['user']['nom'] == 'New User'
 
-def test_login(client):
+def test_login(app, client):
     """
     Test la connexion d'un utilisateur
     """
@@ -98,7 +47,7 @@ def test_login(client):
     assert 'token' in data
     assert data['user']['email'] == 'test@example.com'
 
-def test_get_products(client):
+def test_get_products(app, client):
     """
     Test la récupération de la liste des produits
     """
@@ -117,6 +66,50 @@ def test_get_products(client):
     assert data[0]['nom'] == 'Laptop 1'
     assert data[1]['nom'] == 'Laptop 2'
 
+def test_get_products_compressed(app, client, admin_token):
+    """
+    Test la compression gzip du catalogue et sa mise en cache
+    """
+    import gzip
+    
+    with app.app_context():
+        db.session.add_all([
+            Product(nom=f'Laptop {i}', categorie='Ordinateurs', prix=999.99, description='x' * 50)
+            for i in range(50)
+        ])
+        db.session.commit()
+    
+    plain = client.get('/api/produits')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    
+    response = client.get('/api/produits', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(response.data) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+    
+    # La version compressée est conservée avec l'entrée du cache
+    assert client.get('/api/produits', headers={'Accept-Encoding': 'gzip'}).data == response.data
+    
+    # Une création de produit invalide le catalogue
+    client.post(
+        '/api/produits',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'nom': 'Nouveau', 'prix': 10.0, 'categorie': 'Ordinateurs'}
+    )
+    data = json.loads(gzip.decompress(client.get('/api/produits', headers={'Accept-Encoding': 'gzip'}).data))
+    assert len(data) == 51
+    
+    # Une catégorie inconnue n'occupe pas le cache
+    from app.cache import get_catalogue_cache
+    assert client.get('/api/produits?categorie=inconnue').data == b'[]\n'
+    with app.app_context():
+        assert get_catalogue_cache().get('inconnue') is None
+    
+    # Les petites réponses ne sont pas compressées
+    response = client.get('/api/produits/stock?ids=1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
 def test_create_product(client, admin_token):
     """
     Test la création d'un produit (admin)
@@ -138,7 +131,70 @@ def test_create_product(client, admin_token):
     assert data['product']['nom'] == 'Nouveau Laptop'
     assert data['product']['prix'] == 1499.99
 
-def test_create_order(client, user_token):
+def test_update_product_validation(client, admin_token):
+    """
+    Test la validation de la modification partielle d'un produit
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    response = client.post(
+        '/api/produits',
+        headers=headers,
+        json={'nom': 'Écran', 'prix': 199.0, 'categorie': 'Écrans', 'quantite_stock': 3}
+    )
+    product_id = json.loads(response.data)['product']['id']
+    
+    response = client.put(f'/api/produits/{product_id}', headers=headers, json={'prix': 0, 'quantite_stock': -1})
+    assert response.status_code == 400
+    assert set(json.loads(response.data)['errors']) == {'prix', 'quantite_stock'}
+    
+    response = client.put(f'/api/produits/{product_id}', headers=headers, json=['prix'])
+    assert response.status_code == 400
+    assert 'produit' in json.loads(response.data)['errors']
+    
+    response = client.put(f'/api/produits/{product_id}', headers=headers, json={'prix': 149.0})
+    assert response.status_code == 200
+    product = json.loads(response.data)['product']
+    assert product['prix'] == 149.0
+    assert product['nom'] == 'Écran'
+
+def test_get_products_stock(app, client, admin_token, user_token):
+    """
+    Test le stock groupé et son invalidation après commande et modification
+    """
+    with app.app_context():
+        product1 = Product(nom='Laptop 1', categorie='Ordinateurs', prix=999.99, quantite_stock=10)
+        product2 = Product(nom='Laptop 2', categorie='Ordinateurs', prix=1299.99, quantite_stock=2)
+        db.session.add_all([product1, product2])
+        db.session.commit()
+        id1, id2 = product1.id, product2.id
+    
+    response = client.get(f'/api/produits/stock?ids={id1},{id2},999')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['produits'] == [
+        {'id': id1, 'quantite_stock': 10, 'stock_faible': False},
+        {'id': id2, 'quantite_stock': 2, 'stock_faible': True}
+    ]
+    assert data['introuvables'] == [999]
+    
+    client.post(
+        '/api/commandes',
+        headers={'Authorization': f'Bearer {user_token}'},
+        json={'adresse_livraison': '123 Test St', 'items': [{'produit_id': id1, 'quantite': 3}]}
+    )
+    client.put(
+        f'/api/produits/{id2}',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'quantite_stock': 50}
+    )
+    
+    data = json.loads(client.get(f'/api/produits/stock?ids={id1},{id2}').data)
+    assert [product['quantite_stock'] for product in data['produits']] == [7, 50]
+    
+    assert client.get('/api/produits/stock?ids=a,b').status_code == 400
+    assert client.get('/api/produits/stock').status_code == 400
+
+def test_create_order(app, client, user_token):
     """
     Test la création d'une commande
     """
@@ -200,3 +256,482 @@ def test_update_product_unauthorized(client, user_token):
         json={'prix': 99.99}
     )
     assert response.status_code == 403
+
+def test_order_changes(app, client, admin_token, user_token):
+    """
+    Test la synchronisation incrémentale des commandes
+    """
+    with app.app_context():
+        product = Product(nom='Test Product', categorie='Test', prix=10.0, quantite_stock=10)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+    
+    response = client.post(
+        '/api/commandes',
+        headers={'Authorization': f'Bearer {user_token}'},
+        json={'adresse_livraison': '123 Test St', 'items': [{'produit_id': product_id, 'quantite': 1}]}
+    )
+    order_id = json.loads(response.data)['order']['id']
+    
+    response = client.get('/api/commandes/changes', headers={'Authorization': f'Bearer {user_token}'})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [order['id'] for order in data['commandes']] == [order_id]
+    cursor = data['cursor']
+    
+    # Aucun changement depuis le dernier curseur
+    response = client.get(f'/api/commandes/changes?since={cursor}', headers={'Authorization': f'Bearer {user_token}'})
+    data = json.loads(response.data)
+    assert data['commandes'] == []
+    assert data['cursor'] == cursor
+    
+    client.patch(
+        f'/api/commandes/{order_id}',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'statut': 'validée'}
+    )
+    
+    response = client.get(f'/api/commandes/changes?since={cursor}', headers={'Authorization': f'Bearer {user_token}'})
+    data = json.loads(response.data)
+    assert len(data['commandes']) == 1
+    assert data['commandes'][0]['statut'] == 'validée'
+    assert data['cursor'] > cursor
+    
+    response = client.get('/api/commandes/changes?since=abc', headers={'Authorization': f'Bearer {user_token}'})
+    assert response.status_code == 400
+
+def test_order_stream(app, client, user_token):
+    """
+    Test le flux Server-Sent Events des commandes
+    """
+    response = client.get('/api/commandes/stream', headers={'Authorization': f'Bearer {user_token}'})
+    assert response.status_code == 404
+    
+    app.config['ORDER_STREAM_ENABLED'] = True
+    app.config['ORDER_STREAM_MAX_DURATION'] = 0
+    response = client.get('/api/commandes/stream', headers={'Authorization': f'Bearer {user_token}'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert b'retry:' in response.data
+
+def test_archive_orders(app, client, admin_token, user_token):
+    """
+    Test l'archivage des commandes terminées et la lecture depuis l'archive
+    """
+    from datetime import datetime
+    from app.utils import record_order_event
+    
+    with app.app_context():
+        user = User.query.filter_by(email='user@example.com').first()
+        product = Product(nom='Test Product', categorie='Test', prix=10.0, quantite_stock=10)
+        db.session.add(product)
+        db.session.flush()
+        old_order = Order(utilisateur_id=user.id, adresse_livraison='1 Old St', statut='expédiée',
+                          date_commande=datetime(2020, 1, 1))
+        old_order.items.append(OrderItem(produit_id=product.id, quantite=3, prix_unitaire=10.0))
+        pending_order = Order(utilisateur_id=user.id, adresse_livraison='2 Old St', statut='en_attente',
+                              date_commande=datetime(2020, 1, 1))
+        db.session.add_all([old_order, pending_order])
+        db.session.flush()
+        record_order_event(pending_order)
+        record_order_event(old_order)
+        db.session.commit()
+        old_id, pending_id = old_order.id, pending_order.id
+    
+    headers = {'Authorization': f'Bearer {user_token}'}
+    cursor = json.loads(client.get('/api/commandes/changes', headers=headers).data)['cursor']
+    
+    result = app.test_cli_runner().invoke(args=['archive-orders', '--before', '2021-01-01'])
+    assert result.exit_code == 0
+    assert '1 commande(s)' in result.output
+    
+    # Les événements de la commande archivée sont purgés ; un changement postérieur reste
+    # visible depuis le curseur du client
+    with app.app_context():
+        assert OrderEvent.query.filter_by(commande_id=old_id).count() == 0
+        assert OrderEvent.query.filter_by(commande_id=pending_id).count() == 1
+    client.patch(
+        f'/api/commandes/{pending_id}',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'statut': 'validée'}
+    )
+    data = json.loads(client.get(f'/api/commandes/changes?since={cursor}', headers=headers).data)
+    assert [order['id'] for order in data['commandes']] == [pending_id]
+    assert data['cursor'] > cursor
+    with app.app_context():
+        assert data['cursor'] == db.session.query(db.func.max(OrderEvent.id)).scalar()
+    
+    with app.app_context():
+        assert db.session.get(Order, old_id) is None
+        assert db.session.get(Order, pending_id) is not None
+    
+    response = client.get(f'/api/commandes/{old_id}', headers=headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['statut'] == 'expédiée'
+    assert data['total'] == 30.0
+    
+    response = client.get(f'/api/commandes/{old_id}/lignes', headers=headers)
+    assert response.status_code == 200
+    assert json.loads(response.data)['lignes'][0]['produit'] == 'Test Product'
+    
+    response = client.get('/api/commandes', headers=headers)
+    assert [order['id'] for order in json.loads(response.data)] == [pending_id]
+    response = client.get('/api/commandes?archives=1', headers=headers)
+    assert len(json.loads(response.data)) == 2
+
+def test_login_rate_limited(app, client):
+    """
+    Test la limitation de débit de la connexion
+    """
+    app.config['RATELIMIT_ENABLED'] = True
+    app.config['RATELIMIT_ROUTES'] = dict(app.config['RATELIMIT_ROUTES'], login=(2, 0.01))
+    
+    credentials = {'email': 'nobody@example.com', 'mot_de_passe': 'wrong'}
+    assert client.post('/api/auth/login', json=credentials).status_code == 401
+    assert client.post('/api/auth/login', json=credentials).status_code == 401
+    
+    response = client.post('/api/auth/login', json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_batch_rate_limited_per_order(app, client, user_token):
+    """
+    Test que les routes groupées consomment un jeton par commande
+    """
+    app.config['RATELIMIT_ENABLED'] = True
+    app.config['RATELIMIT_ROUTES'] = dict(app.config['RATELIMIT_ROUTES'], create_order_batch=(5, 0.01))
+    headers = {'Authorization': f'Bearer {user_token}'}
+    batch = {'commandes': [{'adresse_livraison': '1 Test St', 'items': [{'produit_id': 999, 'quantite': 1}]}] * 3}
+    
+    assert client.post('/api/commandes/batch', headers=headers, json=batch).status_code == 400
+    response = client.post('/api/commandes/batch', headers=headers, json=batch)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+@pytest.mark.parametrize('app', [{'config': {'PROXY_FIX_HOPS': 1}}], indirect=True)
+def test_rate_limit_behind_proxy(app, client):
+    """
+    Test que les requêtes anonymes sont limitées par client derrière un proxy de confiance
+    """
+    app.config['RATELIMIT_ENABLED'] = True
+    app.config['RATELIMIT_ROUTES'] = dict(app.config['RATELIMIT_ROUTES'], login=(1, 0.01))
+    
+    credentials = {'email': 'nobody@example.com', 'mot_de_passe': 'wrong'}
+    for address in ['203.0.113.1', '203.0.113.2']:
+        response = client.post('/api/auth/login', json=credentials, headers={'X-Forwarded-For': address})
+        assert response.status_code == 401
+    response = client.post('/api/auth/login', json=credentials, headers={'X-Forwarded-For': '203.0.113.1'})
+    assert response.status_code == 429
+
+def test_overload_returns_503(app, client):
+    """
+    Test le délestage lorsque trop de requêtes sont en cours dans le worker
+    """
+    from app.ratelimit import get_concurrency_limiter
+    
+    app.config['RATELIMIT_ENABLED'] = True
+    limit = app.config['MAX_CONCURRENT_REQUESTS']['login']
+    for _ in range(limit):
+        get_concurrency_limiter().acquire('login', limit)
+    
+    response = client.post('/api/auth/login', json={'email': 'a@example.com', 'mot_de_passe': 'x'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app.config['OVERLOAD_RETRY_AFTER'])
+
+def test_queue_wait_returns_503(app, client):
+    """
+    Test le délestage d'une requête restée trop longtemps dans la file du proxy
+    """
+    import time
+    
+    app.config['RATELIMIT_ENABLED'] = True
+    credentials = {'email': 'a@example.com', 'mot_de_passe': 'x'}
+    
+    stale = {'X-Request-Start': f"t={time.time() - app.config['MAX_QUEUE_WAIT'] - 5:.3f}"}
+    assert client.post('/api/auth/login', json=credentials, headers=stale).status_code == 503
+    
+    fresh = {'X-Request-Start': f"t={time.time():.3f}"}
+    assert client.post('/api/auth/login', json=credentials, headers=fresh).status_code == 401
+
+def test_profile(app, client, admin_token, user_token):
+    """
+    Test l'activation du profilage et la lecture des agrégats
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    response = client.put('/api/admin/profile', headers=headers, json={'actif': True, 'taux': 100})
+    assert response.status_code == 200
+    
+    client.get('/api/produits')
+    client.get('/api/commandes', headers={'Authorization': f'Bearer {user_token}'})
+    
+    response = client.get('/api/admin/profile', headers=headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['actif'] is True
+    assert data['endpoints']['produits.get_products']['requetes'] == 1
+    assert data['endpoints']['commandes.get_orders']['requetes'] == 1
+    assert any('FROM product' in entry['requete'] for entry in data['sql'])
+    
+    data = json.loads(client.get('/api/admin/profile?top=-1', headers=headers).data)
+    assert data['sql'] == []
+    
+    # Le fichier d'un worker arrêté (heartbeat trop ancien) est ignoré puis supprimé
+    from app.profiler import get_profiler
+    with app.app_context():
+        version = get_profiler().read_control()['version']
+    stale_path = os.path.join(app.config['PROFILE_DIR'], '999999-dead.json')
+    with open(stale_path, 'w') as f:
+        json.dump({
+            'version': version, 'heartbeat': 0, 'stacks': {},
+            'endpoints': {'produits.get_products': {'requetes': 50, 'temps_total_ms': 1.0, 'temps_max_ms': 1.0}},
+            'sql': {}
+        }, f)
+    data = json.loads(client.get('/api/admin/profile', headers=headers).data)
+    assert data['endpoints']['produits.get_products']['requetes'] == 1
+    assert not os.path.exists(stale_path)
+    
+    response = client.get('/api/admin/profile?format=collapsed', headers=headers)
+    assert response.mimetype == 'text/plain'
+    for line in response.data.decode().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+    
+    # Désactivé : plus aucune écriture du worker, son dernier dépôt reste lisible
+    import time
+    profiler = app.extensions['profiler']
+    profiler.flush_interval = 0.01
+    client.put('/api/admin/profile', headers=headers, json={'actif': False})
+    worker_path = profiler.worker_path
+    mtime = os.stat(worker_path).st_mtime_ns
+    time.sleep(0.1)
+    assert os.stat(worker_path).st_mtime_ns == mtime
+    profiler.worker_timeout = 0
+    data = json.loads(client.get('/api/admin/profile', headers=headers).data)
+    assert data['endpoints']['produits.get_products']['requetes'] == 1
+    
+    client.delete('/api/admin/profile', headers=headers)
+    client.get('/api/produits')
+    data = json.loads(client.get('/api/admin/profile', headers=headers).data)
+    assert data['actif'] is False
+    assert 'produits.get_products' not in data['endpoints']
+    
+    assert client.put('/api/admin/profile', headers=headers, json={'actif': 'oui'}).status_code == 400
+    response = client.get('/api/admin/profile', headers={'Authorization': f'Bearer {user_token}'})
+    assert response.status_code == 403
+
+def test_profile_concurrent_writes(tmp_path):
+    """
+    Test les écritures simultanées du fichier d'un worker par plusieurs threads
+    """
+    import threading
+    from app.profiler import write_json
+    
+    path = str(tmp_path / 'worker.json')
+    failures = []
+    
+    def write():
+        try:
+            for i in range(200):
+                write_json(path, {'i': i})
+        except OSError as e:
+            failures.append(e)
+    
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    assert os.listdir(tmp_path) == ['worker.json']
+
+def test_cancel_order_restores_stock(app, client, admin_token, user_token):
+    """
+    Test la remise en stock à l'annulation et les transitions de statut
+    """
+    with app.app_context():
+        product = Product(nom='Test Product', categorie='Test', prix=10.0, quantite_stock=10)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+    
+    response = client.post(
+        '/api/commandes',
+        headers={'Authorization': f'Bearer {user_token}'},
+        json={'adresse_livraison': '123 Test St', 'items': [
+            {'produit_id': product_id, 'quantite': 3},
+            {'produit_id': product_id, 'quantite': 2}
+        ]}
+    )
+    order_id = json.loads(response.data)['order']['id']
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    response = client.patch(f'/api/commandes/{order_id}', headers=headers, json={'statut': 'annulée'})
+    assert response.status_code == 200
+    assert json.loads(response.data)['order']['statut'] == 'annulée'
+    with app.app_context():
+        assert db.session.get(Product, product_id).quantite_stock == 10
+    
+    # Une commande annulée ne peut plus changer de statut
+    response = client.patch(f'/api/commandes/{order_id}', headers=headers, json={'statut': 'validée'})
+    assert response.status_code == 400
+
+def test_update_orders_status_bulk(app, client, admin_token):
+    """
+    Test la modification groupée des statuts
+    """
+    with app.app_context():
+        admin = User.query.filter_by(email='admin@example.com').first()
+        product = Product(nom='Test Product', categorie='Test', prix=10.0, quantite_stock=0)
+        db.session.add(product)
+        db.session.flush()
+        orders = []
+        for i in range(20):
+            order = Order(utilisateur_id=admin.id, adresse_livraison='1 Test St', statut='validée')
+            order.items.append(OrderItem(produit_id=product.id, quantite=1, prix_unitaire=10.0))
+            orders.append(order)
+        db.session.add_all(orders)
+        db.session.commit()
+        order_ids = [order.id for order in orders]
+        product_id = product.id
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    # Une commande introuvable bloque toute la transaction
+    response = client.patch('/api/commandes/bulk', headers=headers, json={'ids': order_ids + [9999], 'statut': 'expédiée'})
+    assert response.status_code == 400
+    assert '9999' in json.loads(response.data)['errors']
+    
+    response = client.patch('/api/commandes/bulk', headers=headers, json={'ids': order_ids[:15], 'statut': 'expédiée'})
+    assert response.status_code == 200
+    assert json.loads(response.data)['modifiees'] == 15
+    
+    response = client.patch('/api/commandes/bulk', headers=headers, json={'ids': order_ids, 'statut': 'annulée'})
+    assert response.status_code == 400
+    assert len(json.loads(response.data)['errors']) == 15
+    
+    response = client.patch('/api/commandes/bulk', headers=headers, json={'ids': order_ids[15:], 'statut': 'annulée'})
+    assert response.status_code == 200
+    
+    with app.app_context():
+        assert db.session.get(Product, product_id).quantite_stock == 5
+        statuses = [db.session.get(Order, order_id).statut for order_id in order_ids]
+        assert statuses == ['expédiée'] * 15 + ['annulée'] * 5
+        assert OrderEvent.query.count() == 20
+    
+    response = client.patch('/api/commandes/bulk', headers=headers, json={'ids': [], 'statut': 'expédiée'})
+    assert response.status_code == 400
+
+def test_create_orders_batch(app, client, user_token):
+    """
+    Test la création groupée de commandes et le rapport d'erreurs par commande
+    """
+    with app.app_context():
+        product1 = Product(nom='Laptop 1', categorie='Ordinateurs', prix=100.0, quantite_stock=5)
+        product2 = Product(nom='Laptop 2', categorie='Ordinateurs', prix=50.0, quantite_stock=1)
+        db.session.add_all([product1, product2])
+        db.session.commit()
+        id1, id2 = product1.id, product2.id
+    headers = {'Authorization': f'Bearer {user_token}'}
+    
+    # Les erreurs sont indexées par leur chemin dans le lot
+    response = client.post('/api/commandes/batch', headers=headers, json={'commandes': [
+        {'adresse_livraison': '1 Test St', 'items': [{'produit_id': id2, 'quantite': 1}]},
+        {'items': [{'produit_id': id1, 'quantite': 0}]}
+    ]})
+    assert response.status_code == 400
+    errors = json.loads(response.data)['errors']
+    assert set(errors) == {'commandes[1].adresse_livraison', 'commandes[1].items[0].quantite'}
+    
+    # Le stock est décompté d'une commande à l'autre : la seconde commande échoue
+    response = client.post('/api/commandes/batch', headers=headers, json={'commandes': [
+        {'adresse_livraison': '1 Test St', 'items': [{'produit_id': id2, 'quantite': 1}]},
+        {'adresse_livraison': '2 Test St', 'items': [{'produit_id': id2, 'quantite': 1}]},
+        {'adresse_livraison': '3 Test St', 'items': [{'produit_id': 999, 'quantite': 1}]}
+    ]})
+    assert response.status_code == 400
+    errors = json.loads(response.data)['errors']
+    assert set(errors) == {'commandes[1].items[0].quantite', 'commandes[2].items[0].produit_id'}
+    
+    response = client.post('/api/commandes/batch', headers=headers, json={'commandes': []})
+    assert 'commandes' in json.loads(response.data)['errors']
+    
+    response = client.post('/api/commandes/batch', headers=headers, json={'commandes': [
+        {'adresse_livraison': '1 Test St', 'items': [{'produit_id': id1, 'quantite': 2}, {'produit_id': id2, 'quantite': 1}]},
+        {'adresse_livraison': '2 Test St', 'items': [{'produit_id': id1, 'quantite': 3}]}
+    ]})
+    assert response.status_code == 201
+    created = json.loads(response.data)['commandes']
+    assert [order['total'] for order in created] == [250.0, 300.0]
+    
+    with app.app_context():
+        assert db.session.get(Product, id1).quantite_stock == 0
+        assert db.session.get(Product, id2).quantite_stock == 0
+        assert Order.query.count() == 2
+        assert OrderEvent.query.count() == 2
+
+def test_create_order_too_many_items(app, client, user_token):
+    """
+    Test le refus d'une commande dépassant le nombre maximal d'articles
+    """
+    from app.schemas import ORDER_MAX_ITEMS
+    
+    response = client.post('/api/commandes', headers={'Authorization': f'Bearer {user_token}'}, json={
+        'adresse_livraison': '1 Test St',
+        'items': [{'produit_id': i + 1, 'quantite': 1} for i in range(300000)]
+    })
+    assert response.status_code == 400
+    assert 'items' in json.loads(response.data)['errors']
+    
+    response = client.post('/api/commandes', headers={'Authorization': f'Bearer {user_token}'}, json={
+        'adresse_livraison': '1 Test St',
+        'items': [{'produit_id': 1, 'quantite': 1}] * (ORDER_MAX_ITEMS + 1)
+    })
+    assert 'items' in json.loads(response.data)['errors']
+
+def test_validate_cart(app, client):
+    """
+    Test la validation d'un panier sans écriture
+    """
+    with app.app_context():
+        product = Product(nom='Laptop 1', categorie='Ordinateurs', prix=100.0, quantite_stock=2)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+    
+    response = client.post('/api/panier/valider', json={'items': [{'produit_id': product_id, 'quantite': 2}]})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['valide'] is True
+    assert data['total'] == 200.0
+    assert data['commandes'][0]['lignes'][0]['produit'] == 'Laptop 1'
+    
+    response = client.post('/api/panier/valider', json={'commandes': [
+        {'items': [{'produit_id': product_id, 'quantite': 3}]},
+        {'items': [{'produit_id': 999, 'quantite': 1}]},
+        'pas un objet'
+    ]})
+    data = json.loads(response.data)
+    assert data['valide'] is False
+    assert 'items[0].quantite' in data['commandes'][0]['errors']
+    assert 'items[0].produit_id' in data['commandes'][1]['errors']
+    assert 'commande' in data['commandes'][2]['errors']
+    
+    # Enveloppe invalide : refusée avant toute validation des commandes
+    response = client.post('/api/panier/valider', json=['pas un objet'])
+    assert json.loads(response.data)['errors'] == {'panier': "Le panier doit être un objet"}
+    response = client.post('/api/panier/valider', json={'commandes': [{'items': []}] * 101})
+    assert response.status_code == 400
+    assert set(json.loads(response.data)['errors']) == {'commandes'}
+    
+    # Nombre d'articles par commande borné, avant tout chargement des produits
+    # (au-delà de la limite de variables SQLite, un IN non borné échouait en 500)
+    items = [{'produit_id': i + 1, 'quantite': 1} for i in range(300000)]
+    response = client.post('/api/panier/valider', json={'items': items})
+    assert response.status_code == 200
+    assert 'items' in json.loads(response.data)['commandes'][0]['errors']
+    
+    with app.app_context():
+        assert db.session.get(Product, product_id).quantite_stock == 2
+        assert Order.query.count() == 0
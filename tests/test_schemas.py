@@ -0,0 +1,109 @@
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.schemas import (Field, Schema, String, List, CART_BATCH_SCHEMA, ORDER_SCHEMA, PRODUCT_SCHEMA, PRODUCT_UPDATE_SCHEMA,
+                         ORDER_BATCH_SCHEMA, BULK_STATUS_SCHEMA, PROFILE_SCHEMA, BULK_STATUS_MAX_IDS)
+
+def test_order_schema_paths():
+    """
+    Test les chemins des erreurs d'une commande et de ses articles
+    """
+    assert ORDER_SCHEMA.validate({
+        'adresse_livraison': '1 rue de la Paix',
+        'items': [{'produit_id': 1, 'quantite': 2}]
+    }) == {}
+    
+    errors = ORDER_SCHEMA.validate({
+        'adresse_livraison': '',
+        'items': [{'produit_id': 1, 'quantite': 0}, 'x', {'produit_id': True, 'quantite': 1}]
+    })
+    assert errors == {
+        'adresse_livraison': "L'adresse de livraison est requise",
+        'items[0].quantite': "La quantité doit être un nombre entier positif",
+        'items[1]': "L'article doit être un objet",
+        'items[2].produit_id': "L'identifiant du produit est requis",
+    }
+    
+    assert ORDER_SCHEMA.validate(None) == {'commande': "La commande doit être un objet"}
+    assert set(ORDER_SCHEMA.validate({'items': []})) == {'adresse_livraison', 'items'}
+
+def test_product_schemas():
+    """
+    Test la création (champs requis) et la modification partielle d'un produit
+    """
+    assert set(PRODUCT_SCHEMA.validate({'prix': '10'})) == {'nom', 'prix', 'categorie'}
+    assert PRODUCT_SCHEMA.validate({'nom': 'A', 'prix': 10, 'categorie': 'B', 'description': None}) == {}
+    
+    assert PRODUCT_UPDATE_SCHEMA.validate({}) == {}
+    assert PRODUCT_UPDATE_SCHEMA.validate({'description': None}) == {}
+    assert set(PRODUCT_UPDATE_SCHEMA.validate({'nom': '', 'quantite_stock': 1.5})) == {'nom', 'quantite_stock'}
+
+def test_validate_many():
+    """
+    Test la validation d'un tableau : seuls les éléments invalides sont retournés
+    """
+    products = [{'nom': f'P{i}', 'prix': 1.0, 'categorie': 'C'} for i in range(1000)]
+    products[10]['prix'] = -1
+    products[500] = 42
+    
+    assert PRODUCT_SCHEMA.validate_many(products) == {
+        10: {'prix': "Le prix doit être un nombre positif"},
+        500: {'produit': "Le produit doit être un objet"},
+    }
+
+def test_nested_lists():
+    """
+    Test les chemins des listes imbriquées
+    """
+    schema = Schema('panier', "Objet attendu", {
+        'groupes': List(Schema('groupe', "Groupe attendu", {
+            'lignes': List(Schema('ligne', "Ligne attendue", {
+                'code': String("Code requis", required=True),
+            }), "Lignes requises", required=True),
+        }), "Groupes requis", required=True),
+    })
+    
+    errors = schema.validate({'groupes': [{'lignes': [{'code': 'a'}]}, {'lignes': [{'code': 'b'}, {}, 3]}]})
+    assert errors == {'groupes[1].lignes[1].code': "Code requis", 'groupes[1].lignes[2]': "Ligne attendue"}
+    
+    with pytest.raises(ValueError):
+        Schema('x', "x", {'nom-invalide': String("x")})
+    # Field est abstrait : chaque type de champ génère sa propre condition
+    with pytest.raises(TypeError):
+        Field("x")
+
+def test_scalar_lists():
+    """
+    Test les listes de valeurs (identifiants) et leur taille maximale
+    """
+    assert BULK_STATUS_SCHEMA.validate({'ids': [1, 2, 3], 'statut': 'expédiée'}) == {}
+    
+    errors = BULK_STATUS_SCHEMA.validate({'ids': [1, True, 0, 'x'], 'statut': 'expédiée'})
+    assert set(errors) == {'ids[1]', 'ids[2]', 'ids[3]'}
+    
+    errors = BULK_STATUS_SCHEMA.validate({'ids': list(range(1, BULK_STATUS_MAX_IDS + 2)), 'statut': 'expédiée'})
+    assert set(errors) == {'ids'}
+    assert set(BULK_STATUS_SCHEMA.validate({'ids': [], 'statut': 'x'})) == {'ids', 'statut'}
+
+def test_envelope_schemas():
+    """
+    Test les schémas des lots de commandes et du profilage
+    """
+    errors = ORDER_BATCH_SCHEMA.validate({'commandes': [
+        {'adresse_livraison': '1 rue de la Paix', 'items': [{'produit_id': 1, 'quantite': 1}]},
+        {'items': [{'produit_id': 1, 'quantite': 0}]},
+    ]})
+    assert set(errors) == {'commandes[1].adresse_livraison', 'commandes[1].items[0].quantite'}
+    assert set(ORDER_BATCH_SCHEMA.validate({'commandes': {}})) == {'commandes'}
+    assert set(CART_BATCH_SCHEMA.validate({'commandes': [{'items': [{'produit_id': 1, 'quantite': 1}]}, 3]})) == {
+        'commandes[1]'
+    }
+    
+    assert PROFILE_SCHEMA.validate({'actif': True}) == {}
+    assert PROFILE_SCHEMA.validate({'actif': False, 'taux': 2.5}) == {}
+    assert set(PROFILE_SCHEMA.validate({'actif': 1, 'taux': 101})) == {'actif', 'taux'}
+    assert set(PROFILE_SCHEMA.validate({'actif': True, 'taux': True})) == {'taux'}
@@ -0,0 +1,170 @@
+import pytest
+import json
+import sqlite3
+import sys
+import os
+
+# Ajout du chemin parent au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from app.models import User, Product
+from app.sharding import next_shard_ids
+from app.stock import stock_levels
+
+# Deux shards, bases dans des fichiers de tmp_path (voir le fixture app de conftest.py)
+pytestmark = pytest.mark.parametrize('app', [{'shards': 2}], indirect=True)
+
+@pytest.fixture
+def tokens(app, client):
+    # Deux clients répartis sur des shards différents et un admin
+    with app.app_context():
+        for email, role in [('admin@example.com', 'admin'), ('a@example.com', 'client'), ('b@example.com', 'client')]:
+            user = User(email=email, nom=email.split('@')[0], role=role)
+            user.set_password('secret123')
+            db.session.add(user)
+        db.session.add(Product(nom='Test Product', categorie='Test', prix=10.0, quantite_stock=100))
+        db.session.commit()
+    
+    tokens = {}
+    for email in ['admin@example.com', 'a@example.com', 'b@example.com']:
+        response = client.post('/api/auth/login', json={'email': email, 'mot_de_passe': 'secret123'})
+        tokens[email.split('@')[0]] = {'Authorization': f"Bearer {json.loads(response.data)['token']}"}
+    return tokens
+
+def create_order(client, headers, quantite=1):
+    response = client.post('/api/commandes', headers=headers, json={
+        'adresse_livraison': '1 Test St',
+        'items': [{'produit_id': 1, 'quantite': quantite}]
+    })
+    assert response.status_code == 201
+    return json.loads(response.data)['order']['id']
+
+def count_rows(path, table='order'):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+def count_orders(path):
+    return count_rows(path)
+
+def main_stock(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT quantite_stock FROM product WHERE id = 1').fetchone()[0]
+
+def test_orders_routed_to_user_shard(app, client, tokens, tmp_path):
+    """
+    Test la répartition des commandes par utilisateur et l'unicité des identifiants
+    """
+    ids_a = [create_order(client, tokens['a']) for _ in range(3)]
+    ids_b = [create_order(client, tokens['b']) for _ in range(2)]
+    
+    assert len(set(ids_a + ids_b)) == 5
+    assert count_orders(tmp_path / 'shard0.db') + count_orders(tmp_path / 'shard1.db') == 5
+    assert {count_orders(tmp_path / 'shard0.db'), count_orders(tmp_path / 'shard1.db')} == {3, 2}
+    assert count_orders(tmp_path / 'main.db') == 0
+    assert count_rows(tmp_path / 'main.db', 'order_event') == 0
+    assert count_rows(tmp_path / 'shard0.db', 'order_event') + count_rows(tmp_path / 'shard1.db', 'order_event') == 5
+    
+    # Chaque client ne voit que ses commandes, l'admin voit tous les shards
+    data = json.loads(client.get('/api/commandes', headers=tokens['a']).data)
+    assert sorted(order['id'] for order in data) == sorted(ids_a)
+    data = json.loads(client.get('/api/commandes', headers=tokens['admin']).data)
+    assert sorted(order['id'] for order in data) == sorted(ids_a + ids_b)
+    
+    response = client.get(f'/api/commandes/{ids_b[0]}/lignes', headers=tokens['b'])
+    assert response.status_code == 200
+    assert json.loads(response.data)['lignes'][0]['produit'] == 'Test Product'
+    assert client.get(f'/api/commandes/{ids_b[0]}', headers=tokens['a']).status_code == 403
+    
+    # Journal des modifications : un curseur par shard
+    data = json.loads(client.get('/api/commandes/changes', headers=tokens['admin']).data)
+    assert len(data['commandes']) == 5
+    cursor = data['cursor']
+    assert len(cursor.split('.')) == 2
+    
+    new_id = create_order(client, tokens['a'])
+    data = json.loads(client.get(f'/api/commandes/changes?since={cursor}', headers=tokens['admin']).data)
+    assert [order['id'] for order in data['commandes']] == [new_id]
+    data = json.loads(client.get(f'/api/commandes/changes?since={cursor}', headers=tokens['b']).data)
+    assert data['commandes'] == []
+    assert client.get('/api/commandes/changes?since=3', headers=tokens['admin']).status_code == 400
+
+def test_sharded_status_changes(app, client, tokens):
+    """
+    Test l'annulation et la modification groupée sur plusieurs shards
+    """
+    id_a = create_order(client, tokens['a'], quantite=4)
+    id_b = create_order(client, tokens['b'], quantite=6)
+    
+    response = client.patch('/api/commandes/bulk', headers=tokens['admin'], json={'ids': [id_a, id_b], 'statut': 'annulée'})
+    assert response.status_code == 200
+    assert json.loads(response.data)['modifiees'] == 2
+    
+    with app.app_context():
+        assert stock_levels([1]) == {1: 100}
+    
+    response = client.get(f'/api/commandes/{id_b}', headers=tokens['b'])
+    assert json.loads(response.data)['statut'] == 'annulée'
+    
+    # L'archivage parcourt tous les shards
+    result = app.test_cli_runner().invoke(args=['archive-orders', '--before', '2999-01-01'])
+    assert '2 commande(s)' in result.output
+    response = client.get(f'/api/commandes/{id_a}', headers=tokens['a'])
+    assert response.status_code == 200
+    assert json.loads(response.data)['archivee'] is True
+
+def test_sharded_batch_checkout(app, client, tokens, tmp_path):
+    """
+    Test la création groupée dans le shard de l'utilisateur
+    """
+    response = client.post('/api/commandes/batch', headers=tokens['a'], json={'commandes': [
+        {'adresse_livraison': '1 Test St', 'items': [{'produit_id': 1, 'quantite': 1}]}
+        for _ in range(3)
+    ]})
+    assert response.status_code == 201
+    order_ids = [order['id'] for order in json.loads(response.data)['commandes']]
+    
+    assert sorted(count_orders(tmp_path / f'shard{i}.db') for i in range(2)) == [0, 3]
+    data = json.loads(client.get('/api/commandes', headers=tokens['a']).data)
+    assert sorted(order['id'] for order in data) == sorted(order_ids)
+
+def test_orders_use_shard_reservation(app, client, tokens, tmp_path):
+    """
+    Test que les commandes prélèvent la réserve du shard sans écrire dans la base principale
+    """
+    app.config['STOCK_RESERVATION_BLOCK'] = 10
+    create_order(client, tokens['a'])
+    # Premier prélèvement : un bloc entier est réservé pour le shard
+    assert main_stock(tmp_path / 'main.db') == 90
+    for _ in range(9):
+        create_order(client, tokens['a'])
+    assert main_stock(tmp_path / 'main.db') == 90
+    
+    # Le stock affiché reste le stock total
+    data = json.loads(client.get('/api/produits/1').data)
+    assert data['quantite_stock'] == 90
+    
+    # Un shard peut prélever la réserve d'un autre quand le stock non réservé est épuisé
+    response = client.put('/api/produits/1', headers=tokens['admin'], json={'quantite_stock': 15})
+    assert response.status_code == 200
+    assert json.loads(response.data)['product']['quantite_stock'] == 15
+    create_order(client, tokens['a'], quantite=2)  # réserve de a : 10 - 2, non réservé : 5
+    create_order(client, tokens['b'], quantite=12)  # 5 non réservés + 7 de la réserve de a
+    assert main_stock(tmp_path / 'main.db') == 0
+    with app.app_context():
+        assert stock_levels([1]) == {1: 1}
+    create_order(client, tokens['b'])
+    response = client.post('/api/commandes', headers=tokens['b'], json={
+        'adresse_livraison': '1 Test St',
+        'items': [{'produit_id': 1, 'quantite': 1}]
+    })
+    assert response.status_code == 400
+
+def test_shard_id_counter_single_row(app, tmp_path):
+    """
+    Test que le compteur d'identifiants tient en une ligne par shard
+    """
+    ids = next_shard_ids('shard0', 3) + next_shard_ids('shard0', 2)
+    db.session.commit()
+    assert ids == [2, 4, 6, 8, 10]
+    assert count_rows(tmp_path / 'shard0.db', 'shard_id_sequence') == 1